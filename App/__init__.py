@@ -1,4 +1,12 @@
 from .models import *
-from .views import *
 from .controllers import *
-from .main import *
\ No newline at end of file
+
+# The views and the app factory pull in the web extensions, so they're only
+# imported when something asks for them (e.g. App.create_app)
+def __getattr__(name):
+    from importlib import import_module
+    for module in ("main", "views"):
+        module = import_module(f"{__name__}.{module}")
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,210 @@
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from jwt.exceptions import PyJWTError
+from flask_jwt_extended.exceptions import JWTExtendedException
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from App.database import db
+from App.models import User, Shift, Schedule, DataVersion
+from App.controllers.auth import decode_identity
+from App.controllers.user import UserIdentity, identity_cache
+from App.controllers.staff import roster_select
+from App.controllers.admin import report_page_select, report_page
+from App.controllers.version import SHIFT_DATA, data_version_etag
+from App.serializers import (
+    SHIFT_FIELDS, SCHEDULE_FIELDS, SHAPES, parse_fields, shift_select, schedule_select,
+    encode, dumps
+)
+from App.utils import parse_datetime
+
+# Async drivers for the sync URLs the Flask app is configured with
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg"
+}
+STREAM_BATCH = 500
+
+
+def async_database_url(url):
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class Request:
+    def __init__(self, scope):
+        self.path = scope["path"]
+        self.query_string = scope.get("query_string", b"").decode()
+        # blank values are kept, as in Flask's request.args
+        self.args = {key: values[0] for key, values in parse_qs(self.query_string, keep_blank_values=True).items()}
+        self.headers = {key.decode().lower(): value.decode() for key, value in scope.get("headers", [])}
+
+    # the same string Flask's request.full_path gives, so ETags match across stacks
+    @property
+    def full_path(self):
+        return f"{self.path}?{self.query_string}"
+
+    def arg_int(self, name):
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return None
+
+    def arg_datetime(self, name):
+        value = self.args.get(name)
+        return parse_datetime(value) if value else None
+
+    def token(self, cookie_name):
+        scheme, _, token = self.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            return token
+        cookie = SimpleCookie(self.headers.get("cookie", ""))
+        return cookie[cookie_name].value if cookie_name in cookie else None
+
+
+# Serves the read-heavy endpoints (/staff/roster, /shiftReport, /schedules) as
+# a plain ASGI app over SQLAlchemy's async engine. Runs next to the Flask app
+# (same database, same JWTs, same query params and JSON) so a proxy can route
+# these GETs here; everything else stays on Flask.
+class AsyncReadAPI:
+    def __init__(self, flask_app, engine=None):
+        self.flask_app = flask_app
+        if engine is None:
+            with flask_app.app_context():
+                url = async_database_url(db.engine.url)
+            engine = create_async_engine(url, **flask_app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+        self.engine = engine
+        self.routes = {
+            "/staff/roster": self.roster,
+            "/shiftReport": self.shift_report,
+            "/schedules": self.schedules
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.handle(Request(scope), scope["method"], send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def handle(self, request, method, send):
+        route = self.routes.get(request.path)
+        if route is None:
+            return await self.respond(send, 404, {"error": "Not found"})
+        if method != "GET":
+            return await self.respond(send, 405, {"error": "Method not allowed"})
+
+        # same status codes as the Flask views: 401 no/bad token, 403 refused, 500 database
+        try:
+            identity_id = self.authenticate(request)
+        except (PyJWTError, JWTExtendedException) as e:
+            return await self.respond(send, 401, {"error": str(e)})
+        try:
+            async with self.engine.connect() as conn:
+                identity = await self.get_identity(conn, identity_id)
+                # conditional GET, as etag_on_data_version does for the Flask views
+                version = await conn.scalar(select(DataVersion.version).where(DataVersion.name == SHIFT_DATA))
+                etag = data_version_etag(version or 0, identity_id, request.full_path)
+                if f'"{etag}"' in request.headers.get("if-none-match", ""):
+                    return await self.respond(send, 304, None, etag)
+                body = await route(conn, request, identity)
+                if isinstance(body, str):
+                    return await self.respond(send, 200, body, etag)
+                await self.stream(send, body, etag)
+        except (PermissionError, ValueError) as e:
+            return await self.respond(send, 403, {"error": str(e)})
+        except SQLAlchemyError:
+            return await self.respond(send, 500, {"error": "Database error"})
+
+    def authenticate(self, request):
+        token = request.token(self.flask_app.config["JWT_ACCESS_COOKIE_NAME"])
+        if not token:
+            raise JWTExtendedException("Missing JWT in headers or cookies")
+        with self.flask_app.app_context():
+            return decode_identity(token)
+
+    # process cache first, like get_user_identity
+    async def get_identity(self, conn, identity_id):
+        user_id = int(identity_id)
+        identity = identity_cache.get(user_id)
+        if identity is None:
+            row = (await conn.execute(select(User.id, User.username, User.role).where(User.id == user_id))).first()
+            if row is None:
+                raise PermissionError("Unknown user")
+            identity = UserIdentity(*row)
+            identity_cache.set(identity)
+        return identity
+
+    async def roster(self, conn, request, identity):
+        if identity.role != "staff":
+            raise PermissionError("Only staff can view roster")
+        names, shape = self.output(request, SHIFT_FIELDS)
+        statement = roster_select(names, request.arg_int("staff_id"),
+                                  request.arg_datetime("from"), request.arg_datetime("to"))
+        return encode(names, (await conn.execute(statement)).all(), shape)
+
+    async def shift_report(self, conn, request, identity):
+        if identity.role != "admin":
+            raise PermissionError("Only admins can view shift reports")
+        stream = request.args.get("stream")
+        if not stream and ("limit" in request.args or "after" in request.args):
+            # keyset pagination, as get_shift_report_page does for Flask
+            names, statement, limit = report_page_select(request.arg_int("limit"), request.args.get("after"))
+            return dumps(report_page(names, (await conn.execute(statement)).all(), limit))
+        names, shape = self.output(request, SHIFT_FIELDS)
+        statement = shift_select(names).order_by(Shift.start_time, Shift.id)
+        if stream:
+            # rows go out in batches as they're read, so slow clients don't hold the whole report
+            return (names, await conn.stream(statement.execution_options(yield_per=STREAM_BATCH)))
+        return encode(names, (await conn.execute(statement)).all(), shape)
+
+    async def schedules(self, conn, request, identity):
+        if identity.role != "admin":
+            raise PermissionError("Only admins can view schedules")
+        names, shape = self.output(request, SCHEDULE_FIELDS)
+        return encode(names, (await conn.execute(schedule_select(names).order_by(Schedule.id))).all(), shape)
+
+    def output(self, request, available):
+        shape = request.args.get("shape", "records")
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown shape: {shape}")
+        return parse_fields(available, request.args.get("fields")), shape
+
+    async def respond(self, send, status, body, etag=None):
+        headers = [(b"content-type", b"application/json")]
+        if etag:
+            headers += [(b"etag", f'"{etag}"'.encode()), (b"cache-control", b"no-cache")]
+        payload = b"" if body is None else (body if isinstance(body, str) else dumps(body)).encode()
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": payload})
+
+    # a JSON array written one batch of rows at a time
+    async def stream(self, send, body, etag):
+        names, result = body
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"etag", f'"{etag}"'.encode()), (b"cache-control", b"no-cache")
+        ]})
+        separator = "["
+        async for rows in result.partitions():
+            chunk = ",".join(dumps(dict(zip(names, row))) for row in rows)
+            await send({"type": "http.response.body", "body": (separator + chunk).encode(), "more_body": True})
+            separator = ","
+        await send({"type": "http.response.body", "body": ("]" if separator == "," else "[]").encode()})
+
+
+def create_asgi_app(flask_app):
+    return AsyncReadAPI(flask_app)
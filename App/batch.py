@@ -0,0 +1,98 @@
+import io
+import json
+import shlex
+import time
+from contextlib import redirect_stdout
+
+import click
+from flask.cli import ScriptInfo
+
+from App.database import db
+
+
+# One command per line, either as typed after "flask" ("shift clockin 12") or
+# as JSON with "command" (the same string) or "args" (a list). Blank lines and
+# "#" comments give None; anything unreadable raises ValueError.
+def parse_batch_line(line):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+        if "args" in data:
+            if not isinstance(data["args"], list):
+                raise ValueError('"args" must be a list')
+            return [str(arg) for arg in data["args"]]
+        line = data.get("command")
+        if not isinstance(line, str):
+            raise ValueError('expected "command" as a string or "args" as a list')
+    return shlex.split(line)
+
+
+# Runs flask commands in the current process against one app, capturing what
+# each prints and how long it took. Everything shares the app context, the
+# session and its pooled connection.
+class BatchRunner:
+    def __init__(self, group, app, exclude=()):
+        self.group = group
+        self.app = app
+        self.exclude = set(exclude)
+        self.timings = {}
+        self.failed = 0
+
+    # "shift clockin" for commands in a group, "init" for top-level ones
+    def command_name(self, args):
+        with click.Context(self.group, obj=ScriptInfo(create_app=lambda: self.app)) as ctx:
+            command = self.group.get_command(ctx, args[0]) if args else None
+        if isinstance(command, click.Group) and len(args) > 1:
+            return " ".join(args[:2])
+        return args[0] if args else ""
+
+    def run(self, args):
+        name = self.command_name(args)
+        output = io.StringIO()
+        error = None
+        began = time.perf_counter()
+        try:
+            if args and args[0] in self.exclude:
+                raise click.UsageError(f"{args[0]} can't run inside a batch")
+            with redirect_stdout(output):
+                self.group.main(args=args, prog_name="flask", standalone_mode=False,
+                                obj=ScriptInfo(create_app=lambda: self.app))
+        except click.ClickException as e:
+            error = e.format_message()
+        except SystemExit as e:
+            if e.code not in (0, None):
+                error = f"exited with {e.code}"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        elapsed = (time.perf_counter() - began) * 1000
+
+        if error is not None:
+            # a failed command must not leave the shared session unusable
+            db.session.rollback()
+            self.failed += 1
+        self.timings.setdefault(name, []).append(elapsed)
+        return {
+            "command": args,
+            "ok": error is None,
+            "output": output.getvalue(),
+            "error": error,
+            "ms": round(elapsed, 3)
+        }
+
+    def summary(self):
+        return {
+            "commands": sum(len(times) for times in self.timings.values()),
+            "failed": self.failed,
+            "total_ms": round(sum(sum(times) for times in self.timings.values()), 3),
+            "by_command": {
+                name: {
+                    "count": len(times),
+                    "mean_ms": round(sum(times) / len(times), 3),
+                    "max_ms": round(max(times), 3)
+                } for name, times in sorted(self.timings.items())
+            }
+        }
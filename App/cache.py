@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+
+# Namespaces of cached read results; writes invalidate the ones they affect
+ROSTER_CACHE = "roster"
+REPORT_CACHE = "report"
+
+
+# Every namespace has a generation number that is part of each key. Invalidating
+# bumps the generation, so a reader that started before a write can only store
+# its result under the old generation, where nobody will look for it again.
+
+class NullBackend:
+    def generation(self, namespace):
+        return 0
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def invalidate(self, namespace):
+        pass
+
+    def size(self):
+        return 0
+
+
+# In-process LRU. Each worker has its own copy and only sees its own writes'
+# invalidations, so use it with a single worker.
+class LocalBackend:
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [key for key in self._entries if key.startswith(namespace + ":")]:
+                del self._entries[key]
+
+    def size(self):
+        return len(self._entries)
+
+
+# Shared across workers through Redis (or anything speaking its protocol).
+# Eviction is left to Redis (maxmemory-policy allkeys-lru) plus a TTL so old
+# generations age out.
+class RedisBackend:
+    def __init__(self, client, prefix="rosterapp:", ttl=3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def generation(self, namespace):
+        return int(self.client.get(f"{self.prefix}gen:{namespace}") or 0)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def invalidate(self, namespace):
+        self.client.incr(f"{self.prefix}gen:{namespace}")
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend or NullBackend()
+        self.hits = {}
+        self.misses = {}
+
+    # RESPONSE_CACHE selects the backend: "null" (default), "local" or "redis"
+    def init_app(self, app):
+        kind = app.config.get("RESPONSE_CACHE", "null")
+        if kind == "local":
+            self.backend = LocalBackend(app.config.get("RESPONSE_CACHE_SIZE", 512))
+        elif kind == "redis":
+            import redis
+            client = redis.Redis.from_url(app.config.get("RESPONSE_CACHE_URL", "redis://localhost:6379/0"))
+            self.backend = RedisBackend(client, ttl=app.config.get("RESPONSE_CACHE_TTL", 3600))
+        else:
+            self.backend = NullBackend()
+        self.reset_stats()
+
+    # Returns the cached string for (namespace, key), or calls produce() and caches its result
+    def get_or_set(self, namespace, key, produce):
+        full_key = f"{namespace}:{self.backend.generation(namespace)}:{key}"
+        value = self.backend.get(full_key)
+        if value is not None:
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+            return value
+        self.misses[namespace] = self.misses.get(namespace, 0) + 1
+        value = produce()
+        self.backend.set(full_key, value)
+        return value
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.invalidate(namespace)
+
+    def reset_stats(self):
+        self.hits = {}
+        self.misses = {}
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size(),
+            "hits": dict(self.hits),
+            "misses": dict(self.misses)
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import queue
+import threading
+
+# True inside a gevent-patched process (e.g. gunicorn's gevent worker)
+def gevent_active():
+    if "gevent" not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched("socket")
+
+# Runs a CPU-heavy call (password hashing, the schedule solver) on gevent's
+# native thread pool, so other greenlets keep running while it works; pure
+# Python work still shares the GIL with them, but the hub gets it back every
+# few milliseconds. Outside gevent it simply calls fn.
+def run_blocking(fn, *args, **kwargs):
+    if gevent_active():
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
+
+
+# psycopg2 waits on its socket in C, which blocks gevent's hub for the whole
+# query. This wait callback polls the connection instead and yields to other
+# greenlets until the socket is ready. Returns False if psycopg2 isn't installed.
+def make_psycopg2_green():
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    if extensions.get_wait_callback() is None:
+        extensions.set_wait_callback(_gevent_wait)
+    return True
+
+def _gevent_wait(conn, timeout=None):
+    from psycopg2 import extensions, OperationalError
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+class _Pending:
+    def __init__(self, item):
+        self.item = item
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+# Collects items submitted by concurrent requests and hands them to handler in
+# batches, so a burst of small writes shares one transaction and one commit.
+# handler(items) runs inside an app context and returns one result per item;
+# submit() blocks until the batch holding its item has committed, so a caller
+# is only acknowledged once its write is durable. Under gevent the worker
+# thread is a greenlet. <PREFIX>_MS (0 = off) is how long the first item of a
+# batch waits for company, <PREFIX>_MAX the largest batch.
+class GroupCommitter:
+    def __init__(self, handler, config_prefix):
+        self.handler = handler
+        self.config_prefix = config_prefix
+        self.app = None
+        self.window = 0
+        self.max_batch = 100
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.window = app.config.get(f"{self.config_prefix}_MS", 0) / 1000
+        self.max_batch = app.config.get(f"{self.config_prefix}_MAX", 100)
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def submit(self, item):
+        self._ensure_worker()
+        pending = _Pending(item)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    # started on first use, and again in each forked worker process
+    def _ensure_worker(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self, pending_queue):
+        while True:
+            batch = [pending_queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._apply(batch)
+
+    def _apply(self, batch):
+        try:
+            with self.app.app_context():
+                results = self.handler([pending.item for pending in batch])
+        except Exception as e:
+            # nothing in the batch committed, so every caller gets the error
+            results = [None] * len(batch)
+            for pending in batch:
+                pending.error = e
+        for pending, result in zip(batch, results):
+            pending.result = result
+            pending.done.set()
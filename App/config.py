@@ -6,6 +6,10 @@ def load_config(app, overrides):
     else:
         app.config.from_object('App.default_config')
     app.config.from_prefixed_env()
+    # sizes the connection pool; gunicorn_config.py exports the worker settings it
+    # starts with, and the fallbacks match its defaults
+    for key, default in (("WEB_CONCURRENCY", 4), ("WORKER_CONNECTIONS", 100), ("DB_MAX_CONNECTIONS", 90)):
+        app.config.setdefault(key, int(os.environ.get(key, default)))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['TEMPLATES_AUTO_RELOAD'] = True
     app.config['PREFERRED_URL_SCHEME'] = 'https'
@@ -2,4 +2,9 @@ from .user import *
 from .auth import *
 from .initialize import *
 from .admin import *
-from .staff import *    
+from .staff import *
+from .version import *
+from .export import *
+from .report import *
+from .onshift import *
+from .generate import *
@@ -1,15 +1,31 @@
 from App.models import Shift
 from App.database import db
 from datetime import datetime
-from App.controllers.user import get_user
+from App.controllers.user import get_user, get_user_identity
 
-from App.models import Shift, Schedule
+from App.models import Shift, Schedule, User
+from App.cache import response_cache, REPORT_CACHE
+from App.metrics import metrics
 from App.database import db
+from bisect import bisect_left
+from flask import current_app
 from datetime import datetime
-from App.controllers.user import get_user
+from sqlalchemy import tuple_, select, insert
+from App.controllers.user import get_user, get_user_identity
+from App.controllers.version import bump_data_version
+from App.controllers.onshift import index_shifts
+from App.utils import parse_datetime
+from App.serializers import (
+    SHIFT_FIELDS, SCHEDULE_FIELDS, SHAPES, parse_fields, shift_select, schedule_select,
+    to_record, to_records, encode
+)
+
+REPORT_PAGE_DEFAULT = 100
+REPORT_PAGE_MAX = 1000
+REPORT_STREAM_BATCH = 500
 
 def create_schedule(admin_id, scheduleName): #Not sure why this was missing
-    admin = get_user(admin_id)
+    admin = get_user_identity(admin_id)
     if not admin or admin.role != "admin":
         raise PermissionError("Only admins can create schedules")
 
@@ -20,13 +36,14 @@ def create_schedule(admin_id, scheduleName): #Not sure why this was missing
     )
 
     db.session.add(new_schedule)
+    bump_data_version()
     db.session.commit()
 
     return new_schedule
 
 def schedule_shift(admin_id, staff_id, schedule_id, start_time, end_time):
-    admin = get_user(admin_id)
-    staff = get_user(staff_id)
+    admin = get_user_identity(admin_id)
+    staff = get_user_identity(staff_id)
 
     schedule = db.session.get(Schedule, schedule_id)
 
@@ -36,6 +53,10 @@ def schedule_shift(admin_id, staff_id, schedule_id, start_time, end_time):
         raise ValueError("Invalid staff member")
     if not schedule:
         raise ValueError("Invalid schedule ID")
+    if end_time <= start_time:
+        raise ValueError("Shift end time must be after start time")
+    if find_overlapping_shift(staff_id, start_time, end_time):
+        raise ValueError("Shift overlaps an existing shift for this staff member")
 
     new_shift = Shift(
         staff_id=staff_id,
@@ -45,14 +66,256 @@ def schedule_shift(admin_id, staff_id, schedule_id, start_time, end_time):
     )
 
     db.session.add(new_shift)
+    db.session.flush()
+    index_shifts([(new_shift.id, start_time, end_time)])
+    bump_data_version()
     db.session.commit()
 
     return new_shift
 
 
+# Range query on ix_shift_staff_start_end; returns the id of a clashing shift or None
+def find_overlapping_shift(staff_id, start_time, end_time):
+    return db.session.scalar(
+        select(Shift.id).where(
+            Shift.staff_id == staff_id,
+            Shift.start_time < end_time,
+            Shift.end_time > start_time
+        ).limit(1)
+    )
+
+# Sort-and-sweep overlap check for a batch, O(n log n) overall.
+# `proposed` is a list of (row number, row dict) and `existing` a list of
+# (staff_id, start_time, end_time) already in the database. Returns
+# {row number: error} for rows that clash with an existing shift or with an
+# earlier-starting row of the same batch.
+def find_batch_overlaps(proposed, existing):
+    conflicts = {}
+
+    # against existing shifts: per staff, sorted starts plus a running max of ends,
+    # so "any existing shift starting before my end also ends after my start" is one bisect
+    by_staff = {}
+    for staff_id, start_time, end_time in sorted(existing, key=lambda shift: (shift[0], shift[1])):
+        starts, max_ends = by_staff.setdefault(staff_id, ([], []))
+        starts.append(start_time)
+        max_ends.append(max(end_time, max_ends[-1]) if max_ends else end_time)
+    for number, row in proposed:
+        if row["staff_id"] not in by_staff:
+            continue
+        starts, max_ends = by_staff[row["staff_id"]]
+        before_end = bisect_left(starts, row["end_time"])
+        if before_end and max_ends[before_end - 1] > row["start_time"]:
+            conflicts[number] = "Shift overlaps an existing shift for this staff member"
+
+    # within the batch: sweep each staff member's rows in start order
+    last = {}
+    remaining = [item for item in proposed if item[0] not in conflicts]
+    for number, row in sorted(remaining, key=lambda item: (item[1]["staff_id"], item[1]["start_time"])):
+        previous = last.get(row["staff_id"])
+        if previous and row["start_time"] < previous[1]:
+            conflicts[number] = f"Shift overlaps row {previous[0]}"
+        else:
+            last[row["staff_id"]] = (number, row["end_time"])
+    return conflicts
+
+def parse_shift_row(row):
+    try:
+        return {
+            "staff_id": int(row["staff_id"]),
+            "schedule_id": int(row["schedule_id"]),
+            "start_time": parse_datetime(row["start_time"]),
+            "end_time": parse_datetime(row["end_time"])
+        }
+    except KeyError as e:
+        raise ValueError(f"Missing field {e.args[0]}")
+    except TypeError:
+        raise ValueError("Invalid staff or schedule ID")
+
+# A single executemany INSERT ... RETURNING for shift dicts, plus their hour
+# buckets; returns the new ids. The caller commits.
+def insert_shifts(rows):
+    inserted = db.session.execute(
+        insert(Shift.__table__).returning(Shift.id, Shift.start_time, Shift.end_time), rows).all()
+    index_shifts(inserted)
+    return [row.id for row in inserted]
+
+# Creates many shifts in one transaction. Staff and schedule IDs are checked with one
+# IN query each, and bad rows are reported by (1-based) row number instead of
+# aborting the batch.
+def schedule_shifts(admin_id, rows):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can schedule shifts")
+
+    parsed, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        try:
+            parsed.append((number, parse_shift_row(row)))
+        except ValueError as e:
+            errors.append({"row": number, "error": str(e)})
+
+    staff_ids = {row["staff_id"] for _, row in parsed}
+    schedule_ids = {row["schedule_id"] for _, row in parsed}
+    valid_staff = set(db.session.scalars(
+        select(User.id).where(User.id.in_(staff_ids), User.role == "staff")))
+    valid_schedules = set(db.session.scalars(
+        select(Schedule.id).where(Schedule.id.in_(schedule_ids))))
+
+    candidates = []
+    for number, row in parsed:
+        if row["staff_id"] not in valid_staff:
+            errors.append({"row": number, "error": "Invalid staff member"})
+        elif row["schedule_id"] not in valid_schedules:
+            errors.append({"row": number, "error": "Invalid schedule ID"})
+        elif row["end_time"] <= row["start_time"]:
+            errors.append({"row": number, "error": "Shift end time must be after start time"})
+        else:
+            candidates.append((number, row))
+
+    new_shifts = []
+    if candidates:
+        # one query for every existing shift that could clash with the batch
+        existing = db.session.execute(
+            select(Shift.staff_id, Shift.start_time, Shift.end_time).where(
+                Shift.staff_id.in_({row["staff_id"] for _, row in candidates}),
+                Shift.start_time < max(row["end_time"] for _, row in candidates),
+                Shift.end_time > min(row["start_time"] for _, row in candidates)
+            )
+        ).all()
+        overlaps = find_batch_overlaps(candidates, existing)
+        for number, row in candidates:
+            if number in overlaps:
+                errors.append({"row": number, "error": overlaps[number]})
+            else:
+                new_shifts.append(row)
+
+    created = []
+    if new_shifts:
+        # one commit for the whole batch and its hour buckets
+        created = insert_shifts(new_shifts)
+        bump_data_version()
+        db.session.commit()
+
+    return {
+        "created": created,
+        "errors": sorted(errors, key=lambda error: error["row"])
+    }
+
+
 def get_shift_report(admin_id):
-    admin = get_user(admin_id)
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view shift reports")
+
+    names = list(SHIFT_FIELDS)
+    rows = db.session.execute(shift_select(names).order_by(Shift.start_time, Shift.id))
+    return to_records(names, rows)
+
+# The full report as a JSON string with only the requested fields ("records" or
+# "columns" shape), served from the response cache when possible
+def get_shift_report_json(admin_id, fields=None, shape="records"):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view shift reports")
+    names = parse_fields(SHIFT_FIELDS, fields)
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape: {shape}")
+
+    def produce():
+        rows = db.session.execute(shift_select(names).order_by(Shift.start_time, Shift.id)).all()
+        return encode(names, rows, shape)
+    return response_cache.get_or_set(REPORT_CACHE, f"{','.join(names)}|{shape}", produce)
+
+def get_cache_stats(admin_id):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view cache stats")
+    return response_cache.stats()
+
+# Admins only, unless METRICS_PUBLIC opens it to a scraper that can't log in.
+# Also decides who gets the X-Profile breakdown.
+def check_metrics_access(user_id):
+    if not current_app.config.get("METRICS_PUBLIC", False):
+        user = get_user_identity(user_id) if user_id is not None else None
+        if not user or user.role != "admin":
+            raise PermissionError("Only admins can view metrics")
+
+def render_metrics(user_id):
+    check_metrics_access(user_id)
+    return metrics.render()
+
+def get_schedule(schedule_id):
+    return Schedule.query_with_shifts().filter_by(id=schedule_id).first()
+
+def get_all_schedules():
+    return Schedule.query_with_shifts().all()
+
+# id, name, creator and shift count for every schedule in one query, without loading shifts
+def get_schedule_summaries(admin_id):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view schedules")
+
+    names = list(SCHEDULE_FIELDS)
+    rows = db.session.execute(schedule_select(names).order_by(Schedule.id))
+    return to_records(names, rows)
+
+def get_schedule_summaries_json(admin_id, fields=None, shape="records"):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view schedules")
+    names = parse_fields(SCHEDULE_FIELDS, fields)
+    rows = db.session.execute(schedule_select(names).order_by(Schedule.id)).all()
+    return encode(names, rows, shape)
+
+
+# Report cursors are "<start_time iso>_<shift id>", the last row of the previous page
+def encode_report_cursor(start_time, shift_id):
+    return f"{start_time.isoformat()}_{shift_id}"
+
+def decode_report_cursor(cursor):
+    start, _, shift_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(start), int(shift_id)
+    except ValueError:
+        raise ValueError("Invalid report cursor")
+
+# The keyset query for one report page and the page built from its rows,
+# shared with the async read API
+def report_page_select(limit=None, after=None):
+    limit = min(max(limit or REPORT_PAGE_DEFAULT, 1), REPORT_PAGE_MAX)
+    names = list(SHIFT_FIELDS)
+    statement = shift_select(names).order_by(Shift.start_time, Shift.id)
+    if after:
+        statement = statement.where(tuple_(Shift.start_time, Shift.id) > tuple_(*decode_report_cursor(after)))
+    # fetch one extra row to know whether another page exists
+    return names, statement.limit(limit + 1), limit
+
+def report_page(names, rows, limit):
+    last = rows[limit - 1] if len(rows) > limit else None
+    return {
+        "shifts": to_records(names, rows[:limit]),
+        "next": encode_report_cursor(last.start_time, last.id) if last else None
+    }
+
+def get_shift_report_page(admin_id, limit=None, after=None):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view shift reports")
+
+    names, statement, limit = report_page_select(limit, after)
+    return report_page(names, db.session.execute(statement).all(), limit)
+
+def stream_shift_report(admin_id, batch_size=REPORT_STREAM_BATCH):
+    # permission is checked here, before the caller starts consuming rows
+    admin = get_user_identity(admin_id)
     if not admin or admin.role != "admin":
         raise PermissionError("Only admins can view shift reports")
+    return _iter_shift_report(batch_size)
 
-    return [shift.get_json() for shift in Shift.query.order_by(Shift.start_time).all()]
\ No newline at end of file
+def _iter_shift_report(batch_size):
+    # yield_per fetches in batches (a server-side cursor on Postgres) so memory stays flat
+    names = list(SHIFT_FIELDS)
+    statement = shift_select(names).order_by(Shift.start_time, Shift.id).execution_options(yield_per=batch_size)
+    for row in db.session.execute(statement):
+        yield to_record(names, row)
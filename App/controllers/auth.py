@@ -1,14 +1,23 @@
+from flask import g
 from flask_jwt_extended import (
     create_access_token, jwt_required, JWTManager,
-    get_jwt_identity, verify_jwt_in_request
+    get_jwt_identity, verify_jwt_in_request, get_current_user, decode_token
 )
 from App.models import User
 from App.database import db
+from App.controllers.user import identity_cache, get_user_identity
+
+# Upgrades a stored hash to the configured parameters while we have the plain password
+def rehash_if_needed(user, password):
+  if user.password_needs_rehash():
+    user.set_password(password)
+    db.session.commit()
 
 def login(username, password):
   result = db.session.execute(db.select(User).filter_by(username=username))
   user = result.scalar_one_or_none()
   if user and user.check_password(password):
+    rehash_if_needed(user, password)
     # Store ONLY the user id as a string in JWT 'sub'
     return create_access_token(identity=str(user.id))
   return None
@@ -18,7 +27,8 @@ def loginCLI(username, password):
     user = result.scalar_one_or_none()
 
     if user and user.check_password(password):
-        
+        rehash_if_needed(user, password)
+
         if user.active_token:
             return {"message": "User already logged in", "token": user.active_token}
 
@@ -43,8 +53,20 @@ def logout(username):
     db.session.commit()
     return {"message": f"User {username} logged out successfully"}
 
+# For callers outside Flask's request handling (the async read API): the same
+# signature, expiry and claim checks as @jwt_required, returning the user id.
+# Needs an app context; raises the usual JWT errors on a bad token.
+def decode_identity(token):
+  return decode_token(token)["sub"]
+
 def setup_jwt(app):
     jwt = JWTManager(app)
+    # USER_CACHE_TTL (seconds) turns on the process-wide identity cache
+    identity_cache.configure(app.config.get("USER_CACHE_TTL", 0), app.config.get("USER_CACHE_SIZE", 1024))
+
+    @app.before_request
+    def reset_request_identities():
+        g.pop("user_identities", None)
 
     # Always store a string user id in the JWT identity (sub)
     @jwt.user_identity_loader
@@ -52,14 +74,11 @@ def setup_jwt(app):
         user_id = getattr(identity, "id", identity)
         return str(user_id) if user_id is not None else None
 
+    # current_user is a UserIdentity (id, username, role); later role checks in the
+    # same request reuse it instead of loading the user again
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        identity = jwt_data["sub"]
-        try:
-            user_id = int(identity)
-        except (TypeError, ValueError):
-            return None
-        return db.session.get(User, user_id)
+        return get_user_identity(jwt_data["sub"])
 
     return jwt
 
@@ -69,9 +88,7 @@ def add_auth_context(app):
     def inject_user():
         try:
             verify_jwt_in_request()
-            identity = get_jwt_identity()
-            user_id = int(identity) if identity is not None else None
-            current_user = db.session.get(User, user_id) if user_id is not None else None
+            current_user = get_current_user()
             is_authenticated = current_user is not None
         except Exception as e:
             print(e)
@@ -0,0 +1,54 @@
+import csv
+import io
+from datetime import datetime
+from sqlalchemy import select, func
+
+from App.database import db
+from App.controllers.user import get_user_identity
+from App.controllers.staff import roster_select
+from App.serializers import SHIFT_FIELDS, parse_fields, dumps
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_BATCH = 1000
+
+
+def _check_export(admin_id, fmt):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can export shifts")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+def count_shift_export(admin_id, start=None, end=None, schedule_id=None, staff_id=None):
+    _check_export(admin_id, "csv")
+    statement = roster_select(["id"], staff_id, start, end, schedule_id).order_by(None)
+    return db.session.scalar(select(func.count()).select_from(statement.subquery()))
+
+# Returns a generator of text chunks, one per batch of rows. Permission and
+# arguments are checked here, before the caller starts consuming it.
+def export_shifts(admin_id, fmt="csv", start=None, end=None, schedule_id=None, staff_id=None,
+                  fields=None, batch_size=EXPORT_BATCH):
+    _check_export(admin_id, fmt)
+    names = parse_fields(SHIFT_FIELDS, fields)
+    statement = roster_select(names, staff_id, start, end, schedule_id)
+    return _iter_export(names, statement, fmt, batch_size)
+
+def _iter_export(names, statement, fmt, batch_size):
+    # yield_per fetches in batches (a server-side cursor on Postgres) so memory stays flat
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(names)
+        yield buffer.getvalue()
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+    else:
+        for rows in result.partitions():
+            yield "".join(dumps(dict(zip(names, row))) + "\n" for row in rows)
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
@@ -0,0 +1,127 @@
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+
+from App.models import Shift, Schedule, User
+from App.database import db
+from App.concurrency import run_blocking
+from App.controllers.user import get_user_identity
+from App.controllers.version import bump_data_version
+from App.controllers.admin import insert_shifts
+from App.controllers.report import COVERAGE_MAX_DAYS
+
+
+def _to_slots(minutes, slot_minutes, name):
+    if minutes < 0 or minutes % slot_minutes:
+        raise ValueError(f"{name} must be a multiple of {slot_minutes} minutes")
+    return int(minutes // slot_minutes)
+
+# Fills a new schedule from a demand curve (as for coverage) with shift_hours
+# long shifts for the given staff (default: all staff), starting every
+# start_every minutes from midnight of start for `days` days. Each staff member
+# works at most max_hours per week (weeks counted from start, including their
+# shifts in other schedules) with at least min_rest hours between shifts.
+# The solver (App/solver.py) runs for up to time_budget seconds, over
+# `restarts` seeds and up to `processes` worker processes, and everything is
+# written in one transaction.
+def generate_schedule(admin_id, name, start, days=28, demand=None, staff_ids=None, shift_hours=8,
+                      max_hours=40, min_rest=11, start_every=60, time_budget=None, restarts=1, processes=1):
+    from App.coverage import DAY, parse_demand, demand_curve
+    from App.solver import SchedulingProblem, solve_restarts
+
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can generate schedules")
+    if not name:
+        raise ValueError("A schedule name is required")
+    if not 1 <= days <= COVERAGE_MAX_DAYS:
+        raise ValueError(f"Days must be between 1 and {COVERAGE_MAX_DAYS}")
+    demand = parse_demand(current_app.config.get("COVERAGE_DEMAND") if demand is None else demand)
+    if not demand:
+        raise ValueError("A demand curve is required")
+    slot_minutes = current_app.config.get("COVERAGE_SLOT_MINUTES", 15)
+    if slot_minutes <= 0 or DAY % (slot_minutes * 60):
+        raise ValueError("COVERAGE_SLOT_MINUTES must divide a day")
+    shift_slots = _to_slots(shift_hours * 60, slot_minutes, "Shift length")
+    rest_slots = _to_slots(min_rest * 60, slot_minutes, "Minimum rest")
+    max_week_slots = _to_slots(max_hours * 60, slot_minutes, "Maximum hours")
+    start_slots = _to_slots(start_every, slot_minutes, "Start interval")
+    if not shift_slots or not start_slots:
+        raise ValueError("Shift length and start interval must be positive")
+    if time_budget is None:
+        time_budget = current_app.config.get("SCHEDULE_SOLVER_SECONDS", 5)
+    # also false for NaN
+    if not time_budget > 0:
+        raise ValueError("Time budget must be positive")
+
+    if staff_ids is None:
+        staff_ids = list(db.session.scalars(select(User.id).where(User.role == "staff").order_by(User.id)))
+    else:
+        staff_ids = list(dict.fromkeys(staff_ids))
+        valid = set(db.session.scalars(select(User.id).where(User.id.in_(staff_ids), User.role == "staff")))
+        invalid = [staff_id for staff_id in staff_ids if staff_id not in valid]
+        if invalid:
+            raise ValueError(f"Invalid staff member(s): {', '.join(map(str, invalid))}")
+    if not staff_ids:
+        raise ValueError("No staff to schedule")
+
+    origin = datetime.combine(start.date(), datetime.min.time())
+    slot = timedelta(minutes=slot_minutes)
+    slots = days * DAY // (slot_minutes * 60)
+    stop = origin + slots * slot
+    if shift_slots > slots:
+        raise ValueError("Shift length must fit in the schedule")
+
+    # their shifts in other schedules near the window, as busy slot ranges
+    index = {staff_id: i for i, staff_id in enumerate(staff_ids)}
+    margin = timedelta(hours=shift_hours + min_rest)
+    fixed = {}
+    for staff_id, start_time, end_time in db.session.execute(
+        select(Shift.staff_id, Shift.start_time, Shift.end_time).where(
+            Shift.staff_id.in_(staff_ids), Shift.end_time > origin - margin, Shift.start_time < stop + margin)
+    ):
+        first = (start_time - origin) // slot
+        end = -((origin - end_time) // slot)
+        fixed.setdefault(index[staff_id], []).append((first, end))
+
+    problem = SchedulingProblem(
+        demand_curve(demand, slots, slot_minutes * 60), len(staff_ids), shift_slots, rest_slots,
+        max_week_slots, 7 * DAY // (slot_minutes * 60), start_slots, fixed
+    )
+    # end the read transaction so no pooled connection sits idle while solving,
+    # and solve on gevent's thread pool so the worker keeps serving requests
+    db.session.rollback()
+    began = time.perf_counter()
+    result = run_blocking(solve_restarts, problem, restarts, processes, time_budget)
+    solve_ms = (time.perf_counter() - began) * 1000
+
+    # one transaction: the schedule, its shifts and their hour buckets
+    schedule = Schedule(name=name, created_by=admin_id, created_at=datetime.utcnow())
+    db.session.add(schedule)
+    db.session.flush()
+    rows = [{
+        "staff_id": staff_ids[staff],
+        "schedule_id": schedule.id,
+        "start_time": origin + start_slot * slot,
+        "end_time": origin + (start_slot + shift_slots) * slot
+    } for staff, start_slot in result["shifts"]]
+    if rows:
+        insert_shifts(rows)
+    bump_data_version()
+    db.session.commit()
+
+    hours = slot_minutes / 60
+    return {
+        "schedule_id": schedule.id,
+        "name": name,
+        "start": origin.isoformat(),
+        "end": stop.isoformat(),
+        "shifts": len(rows),
+        "staff_used": len({staff for staff, _ in result["shifts"]}),
+        "demand_hours": round(int(problem.required.sum()) * hours, 2),
+        "rostered_hours": round(result["rostered_slots"] * hours, 2),
+        "shortfall_hours": round(result["shortfall_slots"] * hours, 2),
+        "seed": result["seed"],
+        "solve_ms": round(solve_ms, 1)
+    }
@@ -0,0 +1,65 @@
+from datetime import datetime
+from sqlalchemy import select, insert, delete
+
+from App.models import Shift, ShiftBucket
+from App.database import db
+from App.controllers.user import get_user_identity
+from App.controllers.version import bump_data_version
+from App.serializers import SHIFT_FIELDS, SHAPES, parse_fields, shift_select, to_records, encode
+
+REINDEX_BATCH = 5000
+
+
+# Adds the hour buckets for (shift_id, start_time, end_time) tuples in one
+# executemany; called inside the transaction that creates the shifts, which
+# commits them together
+def index_shifts(shifts):
+    rows = [row for shift in shifts for row in ShiftBucket.rows(*shift)]
+    if rows:
+        db.session.execute(insert(ShiftBucket.__table__), rows)
+    return len(rows)
+
+# Rebuilds the whole index from the shift table, e.g. after the migration that
+# adds it or an import that bypassed the controllers
+def reindex_shifts(admin_id, batch_size=REINDEX_BATCH):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can rebuild the shift index")
+    db.session.execute(delete(ShiftBucket))
+    shifts = buckets = 0
+    result = db.session.execute(
+        select(Shift.id, Shift.start_time, Shift.end_time).execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        buckets += index_shifts(rows)
+        shifts += len(rows)
+    bump_data_version()
+    db.session.commit()
+    return {"shifts": shifts, "buckets": buckets}
+
+# Shifts in progress at `at` (start inclusive, end exclusive): one primary-key
+# lookup of at's hour bucket, then only that hour's shifts are checked
+def on_shift_select(names, at):
+    return (
+        shift_select(names)
+        .join(ShiftBucket, ShiftBucket.shift_id == Shift.id)
+        .where(ShiftBucket.hour == ShiftBucket.hour_of(at), Shift.start_time <= at, Shift.end_time > at)
+        .order_by(Shift.staff_id, Shift.id)
+    )
+
+def _check_on_shift_access(user_id):
+    user = get_user_identity(user_id)
+    if not user or user.role not in ("admin", "staff"):
+        raise PermissionError("Only admins and staff can see who is on shift")
+
+def get_on_shift(user_id, at=None):
+    _check_on_shift_access(user_id)
+    names = list(SHIFT_FIELDS)
+    return to_records(names, db.session.execute(on_shift_select(names, at or datetime.now())))
+
+def get_on_shift_json(user_id, at=None, fields=None, shape="records"):
+    _check_on_shift_access(user_id)
+    names = parse_fields(SHIFT_FIELDS, fields)
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape: {shape}")
+    rows = db.session.execute(on_shift_select(names, at or datetime.now())).all()
+    return encode(names, rows, shape)
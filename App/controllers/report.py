@@ -0,0 +1,155 @@
+from datetime import date, datetime, timedelta
+from itertools import chain
+from flask import current_app
+from sqlalchemy import select, func, case, cast, Date
+
+from App.database import db
+from App.models import Shift, User, Schedule
+from App.controllers.user import get_user_identity
+
+HOURS_GROUPS = ("day", "week")
+EPOCH = datetime(1970, 1, 1)
+COVERAGE_MAX_DAYS = 366
+
+
+# SQLite stores datetimes as text, so durations and buckets go through
+# julianday()/date(); Postgres subtracts timestamps and truncates natively.
+
+def _hours_between(dialect, start, end):
+    if dialect == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 24
+    return func.extract("epoch", end - start) / 3600
+
+def _period(dialect, column, group):
+    if dialect == "sqlite":
+        # weeks start on Monday: forward to Sunday, then back six days
+        return func.date(column) if group == "day" else func.date(column, "weekday 0", "-6 days")
+    return cast(func.date_trunc(group, column), Date)
+
+def _epoch_seconds(dialect, column):
+    if dialect == "sqlite":
+        return (func.julianday(column) - 2440587.5) * 86400
+    return func.extract("epoch", column)
+
+def _count_where(condition):
+    return func.count(case((condition, 1)))
+
+# Worked and scheduled hours plus late arrivals and early departures per staff
+# member per day or week, aggregated in one query. Clock-ins more than grace
+# minutes after the start (or clock-outs that far before the end) count.
+def get_hours_report(admin_id, group="day", start=None, end=None, staff_id=None, grace=0):
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view hours reports")
+    if group not in HOURS_GROUPS:
+        raise ValueError(f"Unknown grouping: {group}")
+
+    dialect = db.session.get_bind().dialect.name
+    period = _period(dialect, Shift.start_time, group).label("period")
+    grace_hours = grace / 60
+    statement = (
+        select(
+            Shift.staff_id,
+            User.username,
+            period,
+            func.count(Shift.id).label("shifts"),
+            func.sum(_hours_between(dialect, Shift.start_time, Shift.end_time)).label("scheduled_hours"),
+            func.sum(_hours_between(dialect, Shift.clock_in, Shift.clock_out)).label("worked_hours"),
+            _count_where(_hours_between(dialect, Shift.start_time, Shift.clock_in) > grace_hours).label("late_arrivals"),
+            _count_where(_hours_between(dialect, Shift.clock_out, Shift.end_time) > grace_hours).label("early_departures")
+        )
+        .join(User, User.id == Shift.staff_id)
+        .group_by(Shift.staff_id, User.username, period)
+        .order_by(period, Shift.staff_id)
+    )
+    if start is not None:
+        statement = statement.where(Shift.start_time >= start)
+    if end is not None:
+        statement = statement.where(Shift.start_time < end)
+    if staff_id is not None:
+        statement = statement.where(Shift.staff_id == staff_id)
+
+    return [{
+        "staff_id": row.staff_id,
+        "staff_name": row.username,
+        "period": row.period.isoformat() if isinstance(row.period, date) else row.period,
+        "shifts": row.shifts,
+        "scheduled_hours": round(float(row.scheduled_hours or 0), 2),
+        "worked_hours": round(float(row.worked_hours or 0), 2),
+        "late_arrivals": row.late_arrivals,
+        "early_departures": row.early_departures
+    } for row in db.session.execute(statement)]
+
+# Rostered headcount per slot (COVERAGE_SLOT_MINUTES, default 15) for a
+# schedule against a daily demand curve (COVERAGE_DEMAND unless one is given),
+# over whole days from start (default: the first shift's day) to end (default:
+# the day after the last shift ends). Shift times come out of SQL as epoch
+# seconds so no datetimes are built per row; the counting is vectorized in
+# App/coverage.py, imported here so numpy only loads when coverage is used.
+def get_schedule_coverage(admin_id, schedule_id, start=None, end=None, demand=None):
+    import numpy as np
+    from App.coverage import DAY, parse_demand, format_demand, demand_curve, headcounts, shortfalls
+
+    admin = get_user_identity(admin_id)
+    if not admin or admin.role != "admin":
+        raise PermissionError("Only admins can view coverage")
+    if db.session.scalar(select(Schedule.id).where(Schedule.id == schedule_id)) is None:
+        raise ValueError("Invalid schedule ID")
+    slot_minutes = current_app.config.get("COVERAGE_SLOT_MINUTES", 15)
+    slot_seconds = slot_minutes * 60
+    if slot_seconds <= 0 or DAY % slot_seconds:
+        raise ValueError("COVERAGE_SLOT_MINUTES must divide a day")
+    demand = parse_demand(current_app.config.get("COVERAGE_DEMAND") if demand is None else demand)
+
+    dialect = db.session.get_bind().dialect.name
+    statement = select(_epoch_seconds(dialect, Shift.start_time), _epoch_seconds(dialect, Shift.end_time)) \
+        .where(Shift.schedule_id == schedule_id)
+    if start is not None:
+        statement = statement.where(Shift.end_time > start)
+    if end is not None:
+        statement = statement.where(Shift.start_time < end)
+    # a Core execute skips the ORM result layer; flattened because numpy probes
+    # every Row object when given a list of them
+    rows = db.session.connection().execute(statement).all()
+    times = np.rint(np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=2 * len(rows))) \
+        .astype(np.int64).reshape(-1, 2)
+    starts, ends = times[:, 0], times[:, 1]
+
+    if start is not None:
+        origin = int((start - EPOCH).total_seconds()) // DAY * DAY
+    else:
+        origin = int(starts.min()) // DAY * DAY if len(starts) else 0
+    if end is not None:
+        stop = -(-int((end - EPOCH).total_seconds()) // DAY) * DAY
+    else:
+        stop = -(-int(ends.max()) // DAY) * DAY if len(ends) else origin
+    if stop - origin > COVERAGE_MAX_DAYS * DAY:
+        raise ValueError(f"Coverage is limited to {COVERAGE_MAX_DAYS} days")
+    slots = max(stop - origin, 0) // slot_seconds
+
+    headcount = headcounts(starts, ends, origin, slots, slot_seconds)
+    required = demand_curve(demand, slots, slot_seconds)
+    runs = shortfalls(headcount, required)
+    missing = np.maximum(required - headcount, 0)
+
+    def at(slot):
+        return (EPOCH + timedelta(seconds=origin + slot * slot_seconds)).isoformat()
+    return {
+        "schedule_id": schedule_id,
+        "start": at(0),
+        "end": at(slots),
+        "slot_minutes": slot_minutes,
+        "demand": format_demand(demand),
+        "shifts": len(starts),
+        "peak_headcount": int(headcount.max()) if slots else 0,
+        "understaffed_slots": int(np.count_nonzero(missing)),
+        "staff_hours_short": round(int(missing.sum()) * slot_minutes / 60, 2),
+        "shortfalls": [{
+            "start": at(first),
+            "end": at(end),
+            "max_short": short,
+            "min_rostered": rostered
+        } for first, end, short, rostered in runs],
+        "headcount": headcount.tolist(),
+        "required": required.tolist()
+    }
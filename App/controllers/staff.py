@@ -1,43 +1,105 @@
-from App.models import Shift
+import json
+from App.models import Shift, User
 from App.database import db
+from App.cache import response_cache, ROSTER_CACHE
 from datetime import datetime
-from App.controllers.user import get_user
+from sqlalchemy import update, exists
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from App.concurrency import GroupCommitter
+from App.controllers.user import get_user, get_user_identity
+from App.controllers.version import bump_data_version
+from App.serializers import SHIFT_FIELDS, SHAPES, parse_fields, shift_select, to_records, encode
 
-def get_combined_roster(staff_id):
-    staff = get_user(staff_id)
+def get_combined_roster(staff_id, for_staff_id=None, start=None, end=None):
+    staff = get_user_identity(staff_id)
     if not staff or staff.role != "staff":
         raise PermissionError("Only staff can view roster")
-    return [shift.get_json() for shift in Shift.query.order_by(Shift.start_time).all()]
 
+    names = list(SHIFT_FIELDS)
+    rows = db.session.execute(roster_select(names, for_staff_id, start, end))
+    return to_records(names, rows)
 
-def clock_in(staff_id, shift_id):
-    staff = get_user(staff_id)
-    if not staff or staff.role != "staff":
-        raise PermissionError("Only staff can clock in")
+# optional filters: one staff member's (or schedule's) shifts, starting within [start, end)
+def roster_select(names, for_staff_id=None, start=None, end=None, schedule_id=None):
+    statement = shift_select(names)
+    if for_staff_id is not None:
+        statement = statement.where(Shift.staff_id == for_staff_id)
+    if schedule_id is not None:
+        statement = statement.where(Shift.schedule_id == schedule_id)
+    if start is not None:
+        statement = statement.where(Shift.start_time >= start)
+    if end is not None:
+        statement = statement.where(Shift.start_time < end)
+    return statement.order_by(Shift.start_time, Shift.id)
 
-    shift = db.session.get(Shift, shift_id)
+# The roster as a JSON string with only the requested fields ("records" or
+# "columns" shape), served from the response cache when possible
+def get_combined_roster_json(staff_id, for_staff_id=None, start=None, end=None, fields=None, shape="records"):
+    # role check before the cache so a cached roster is never handed to a non-staff user
+    staff = get_user_identity(staff_id)
+    if not staff or staff.role != "staff":
+        raise PermissionError("Only staff can view roster")
+    names = parse_fields(SHIFT_FIELDS, fields)
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape: {shape}")
 
-    if not shift or shift.staff_id != staff_id:
-        raise ValueError("Invalid shift for staff")
+    def produce():
+        rows = db.session.execute(roster_select(names, for_staff_id, start, end)).all()
+        return encode(names, rows, shape)
+    key = json.dumps([for_staff_id, start and start.isoformat(), end and end.isoformat(), names, shape])
+    return response_cache.get_or_set(ROSTER_CACHE, key, produce)
 
-    shift.clock_in = datetime.now()
-    db.session.commit()
-    return shift
 
+def clock_in(staff_id, shift_id):
+    return _clock(staff_id, shift_id, "clock_in", "Only staff can clock in")
 
 def clock_out(staff_id, shift_id):
-    staff = get_user(staff_id)
-    if not staff or staff.role != "staff":
-        raise PermissionError("Only staff can clock out")
+    return _clock(staff_id, shift_id, "clock_out", "Only staff can clock out")
+
+# One conditional UPDATE ... RETURNING per event; the role lookup only happens
+# when no row matched, to tell a non-staff user from a wrong shift
+def _clock(staff_id, shift_id, column, permission_error):
+    event = (staff_id, shift_id, column, datetime.now())
+    if clock_committer.enabled:
+        values = clock_committer.submit(event)
+    else:
+        values = apply_clock_events([event])[0]
 
-    shift = db.session.get(Shift, shift_id)
-    if not shift or shift.staff_id != staff_id:
+    if values is None:
+        staff = get_user_identity(staff_id)
+        if not staff or staff.role != "staff":
+            raise PermissionError(permission_error)
         raise ValueError("Invalid shift for staff")
 
-    shift.clock_out = datetime.now()
+    # rebuild the committed row as a session object without reloading it
+    shift = Shift(**values)
+    make_transient_to_detached(shift)
+    return db.session.merge(shift, load=False)
+
+# Applies (staff_id, shift_id, column, time) events in one transaction and
+# returns each updated row as a dict, or None where the shift didn't match
+def apply_clock_events(events):
+    rows = []
+    for staff_id, shift_id, column, when in events:
+        is_staff = exists().where(User.id == staff_id, User.role == "staff")
+        row = db.session.execute(
+            update(Shift)
+            .where(Shift.id == shift_id, Shift.staff_id == staff_id, is_staff)
+            .values({column: when})
+            .returning(*Shift.__table__.c)
+            .execution_options(synchronize_session=False)
+        ).first()
+        rows.append(dict(row._mapping) if row else None)
+
+    if not any(rows):
+        db.session.rollback()
+        return rows
+    bump_data_version()
     db.session.commit()
-    return shift
+    return rows
+
+clock_committer = GroupCommitter(apply_clock_events, "CLOCK_GROUP_COMMIT")
 
 def get_shift(shift_id):
-    shift = db.session.get(Shift, shift_id)
+    shift = db.session.get(Shift, shift_id, options=[joinedload(Shift.staff)])
     return shift
\ No newline at end of file
@@ -1,9 +1,64 @@
+import threading, time
+from collections import namedtuple, OrderedDict
+from flask import g, has_request_context
+from sqlalchemy import event
 from App.models import User, Admin, Staff, Shift
 from App.database import db
+from App.controllers.version import bump_data_version
+from App.serializers import USER_FIELDS, parse_fields, user_select, to_records, encode
 from datetime import datetime
 
 VALID_ROLES = {"user", "staff", "admin"}
 
+# The fields role checks and the JWT current_user need, without a full User row
+UserIdentity = namedtuple("UserIdentity", ["id", "username", "role"])
+
+# Process-wide LRU of user id -> UserIdentity with a TTL. Disabled (ttl 0) unless
+# USER_CACHE_TTL is configured; entries are dropped whenever a user row changes.
+class IdentityCache:
+    def __init__(self, ttl=0, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.invalidate()
+
+    def get(self, user_id):
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            identity, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return identity
+
+    def set(self, identity):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[identity.id] = (identity, time.monotonic() + self.ttl)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+identity_cache = IdentityCache()
+
 def create_user(username, password, role):
     role = role.lower().strip()
     if role not in VALID_ROLES:
@@ -26,19 +81,58 @@ def get_user_by_username(username):
 def get_user(id):
     return db.session.get(User, id)
 
+# Resolves a user id (int or JWT "sub" string) to a UserIdentity. Checks the
+# current request first, then the process cache, and only then queries.
+def get_user_identity(id):
+    try:
+        user_id = int(id)
+    except (TypeError, ValueError):
+        return None
+
+    request_identities = g.setdefault("user_identities", {}) if has_request_context() else {}
+    identity = request_identities.get(user_id) or identity_cache.get(user_id)
+    if identity is None:
+        row = db.session.execute(
+            db.select(User.id, User.username, User.role).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        identity = UserIdentity(*row)
+        identity_cache.set(identity)
+    request_identities[user_id] = identity
+    return identity
+
+def invalidate_user_identity(id):
+    identity_cache.invalidate(id)
+    if has_request_context():
+        g.get("user_identities", {}).pop(id, None)
+
+# Covers every ORM write to a user (update_user, role changes, the admin panel)
+@event.listens_for(User, "after_update", propagate=True)
+@event.listens_for(User, "after_delete", propagate=True)
+def _user_changed(mapper, connection, target):
+    invalidate_user_identity(target.id)
+
 def get_all_users():
     return User.query.all()
 
-def get_all_users_json():
-    users = get_all_users()
-    if not users:
-        return []
-    return [user.get_json() for user in users]
+def get_all_users_json(fields=None):
+    names = parse_fields(USER_FIELDS, fields)
+    return to_records(names, db.session.execute(user_select(names).order_by(User.id)))
+
+# Encoded straight from the row tuples, for the API listing
+def encode_all_users(fields=None, shape="records"):
+    names = parse_fields(USER_FIELDS, fields)
+    return encode(names, db.session.execute(user_select(names).order_by(User.id)).all(), shape)
 
 def update_user(id, username):
     user = get_user(id)
     if user:
         user.username = username
+        # staff names appear in rosters and reports
+        bump_data_version()
         db.session.commit()
+        # again after commit, so a read that raced the flush can't keep the old name cached
+        invalidate_user_identity(user.id)
         return user
     return None
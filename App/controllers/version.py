@@ -0,0 +1,81 @@
+import hashlib
+import logging
+from sqlalchemy import event, inspect, select, update, insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from App.models import DataVersion, User, Schedule, Shift
+from App.database import db
+from App.cache import response_cache, ROSTER_CACHE, REPORT_CACHE
+
+# Shifts, schedules and the staff names shown on them
+SHIFT_DATA = "shifts"
+# logins and token changes also update users, but only their names are shown
+SHIFT_MODELS = (Shift, Schedule)
+# cached responses built from each data set
+DATA_CACHES = {SHIFT_DATA: (ROSTER_CACHE, REPORT_CACHE)}
+
+logger = logging.getLogger(__name__)
+
+def get_data_version(name=SHIFT_DATA):
+    return db.session.scalar(select(DataVersion.version).where(DataVersion.name == name)) or 0
+
+# Marks the current transaction as changing `name`; the version goes up just
+# after it commits, in its own one-statement transaction, so concurrent writers
+# don't queue on the version row while theirs are open. A rollback drops the
+# mark. ORM changes to shifts, schedules and users (e.g. from Flask-Admin) are
+# marked automatically; Core writes call this.
+def bump_data_version(name=SHIFT_DATA):
+    db.session.info.setdefault("changed_data", set()).add(name)
+
+# Shared by the Flask views and the async read API, so both stacks agree on ETags
+def data_version_etag(version, identity, full_path):
+    return hashlib.sha1(f"{version}|{identity}|{full_path}".encode()).hexdigest()
+
+def _increment(conn, name):
+    increment = update(DataVersion).where(DataVersion.name == name).values(version=DataVersion.version + 1)
+    if conn.execute(increment).rowcount == 0:
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(DataVersion).values(name=name, version=1))
+        except IntegrityError:
+            # another writer created the row first
+            conn.execute(increment)
+
+def _changes_shift_data(obj, dirty):
+    if isinstance(obj, SHIFT_MODELS):
+        return True
+    return isinstance(obj, User) and (not dirty or inspect(obj).attrs.username.history.has_changes())
+
+@event.listens_for(db.session, "after_flush")
+def _mark_orm_changes(session, flush_context):
+    if (any(_changes_shift_data(obj, False) for obj in (*session.new, *session.deleted))
+            or any(_changes_shift_data(obj, True) for obj in session.dirty)):
+        session.info.setdefault("changed_data", set()).add(SHIFT_DATA)
+
+@event.listens_for(db.session, "after_commit")
+def _keep_committed_marks(session):
+    names = session.info.pop("changed_data", None)
+    if names:
+        session.info.setdefault("committed_data", set()).update(names)
+
+# Runs once the session has handed its connection back to the pool, so a
+# writer never holds two. Cached responses are dropped first: readers that
+# raced the commit stored theirs under the old generation, and none can pair
+# an old body with the new version. Readers can see the new data with the old
+# version for the moment in between, but no client can keep a stale copy past
+# the bump. The write has committed by now, so a failed bump is logged, not raised.
+@event.listens_for(db.session, "after_transaction_end")
+def _bump_committed(session, transaction):
+    if transaction.parent is not None:
+        return
+    session.info.pop("changed_data", None)
+    names = session.info.pop("committed_data", None)
+    if not names:
+        return
+    for name in sorted(names):
+        response_cache.invalidate(*DATA_CACHES.get(name, ()))
+    try:
+        with session.get_bind().begin() as conn:
+            for name in sorted(names):
+                _increment(conn, name)
+    except SQLAlchemyError:
+        logger.exception("Could not bump data version(s) %s", ", ".join(sorted(names)))
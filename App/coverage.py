@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+
+DAY = 86400
+
+
+# Demand is a daily step curve: "HH:MM" -> minimum staff from that time of day
+# until the next entry, wrapping past midnight (so before the first entry the
+# last one applies). Accepts a dict, a JSON object or "08:00=3,17:00=2".
+# Returns {seconds after midnight: minimum}.
+def parse_demand(spec):
+    if not spec:
+        return {}
+    if isinstance(spec, str):
+        spec = spec.strip()
+        if spec.startswith("{"):
+            spec = json.loads(spec)
+        else:
+            entries = [item.split("=", 1) for item in spec.split(",") if item.strip()]
+            if any(len(entry) != 2 for entry in entries):
+                raise ValueError("Demand must look like 08:00=3,17:00=2")
+            spec = dict(entries)
+
+    demand = {}
+    for time_of_day, required in spec.items():
+        try:
+            hours, minutes = (int(part) for part in time_of_day.strip().split(":"))
+            required = int(required)
+        except (ValueError, TypeError, AttributeError):
+            raise ValueError(f"Invalid demand entry: {time_of_day}={required}")
+        if not (0 <= hours < 24 and 0 <= minutes < 60) or required < 0:
+            raise ValueError(f"Invalid demand entry: {time_of_day}={required}")
+        demand[hours * 3600 + minutes * 60] = required
+    return demand
+
+def format_demand(demand):
+    return {f"{offset // 3600:02d}:{offset % 3600 // 60:02d}": required for offset, required in sorted(demand.items())}
+
+# Required staff per slot for `slots` slots starting at a midnight: one day of
+# the step curve, repeated
+def demand_curve(demand, slots, slot_seconds):
+    steps = sorted(demand.items())
+    daily = np.full(DAY // slot_seconds, steps[-1][1] if steps else 0, dtype=np.int64)
+    for offset, required in steps:
+        daily[offset // slot_seconds:] = required
+    return np.resize(daily, slots)
+
+# Rostered headcount in each slot of [origin, origin + slots * slot_seconds),
+# from arrays of shift start and end times in epoch seconds. A shift counts in
+# a slot only if it covers all of it. Difference array: +1 at each shift's
+# first slot, -1 after its last, and the running sum is the headcount.
+def headcounts(starts, ends, origin, slots, slot_seconds):
+    first = np.clip(-((origin - starts) // slot_seconds), 0, slots)
+    last = np.clip((ends - origin) // slot_seconds, 0, slots)
+    covering = first < last
+    diff = (np.bincount(first[covering], minlength=slots + 1)
+            - np.bincount(last[covering], minlength=slots + 1))
+    return np.cumsum(diff[:slots])
+
+# Runs of consecutive understaffed slots as (first slot, end slot, most staff
+# missing, fewest rostered)
+def shortfalls(headcount, required):
+    short = np.maximum(required - headcount, 0)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], short > 0, [0])).astype(np.int8)))
+    return [
+        (int(first), int(end), int(short[first:end].max()), int(headcount[first:end].min()))
+        for first, end in zip(edges[::2], edges[1::2])
+    ]
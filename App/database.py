@@ -1,14 +1,48 @@
+import math
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from App.concurrency import gevent_active, make_psycopg2_green
 
 
 db = SQLAlchemy()
 
+# Flask-Migrate brings in Alembic, which only the db commands need
 def get_migrate(app):
+    from flask_migrate import Migrate
     return Migrate(app, db)
 
 def create_db():
     db.create_all()
-    
+
+# Each worker process gets its share of the server's connection limit, capped
+# by how many requests it runs at once: three quarters kept open, the rest as
+# overflow. Pre-ping and recycle drop connections the server or a proxy closed.
+def pool_options(uri, workers, concurrency, max_connections):
+    if uri.startswith("sqlite"):
+        return {}
+    budget = max(min(max_connections // max(workers, 1), concurrency), 1)
+    pool_size = max(math.ceil(budget * 0.75), 1)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": budget - pool_size,
+        "pool_timeout": 10,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800
+    }
+
 def init_db(app):
-    db.init_app(app)
\ No newline at end of file
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    options = pool_options(uri, app.config["WEB_CONCURRENCY"], app.config["WORKER_CONNECTIONS"],
+                           app.config["DB_MAX_CONNECTIONS"])
+    # anything set explicitly in SQLALCHEMY_ENGINE_OPTIONS wins
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    if gevent_active() and uri.startswith("postgres"):
+        make_psycopg2_green()
+    db.init_app(app)
+
+# After a fork the child must not reuse the parent's pooled connections.
+# close=False leaves them open for the parent and just forgets them here.
+def dispose_after_fork(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -1,41 +1,59 @@
 import os
 from flask import Flask, render_template
-from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
-from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from werkzeug.datastructures import  FileStorage
 
 from App.database import init_db
+from App.cache import response_cache
 from App.config import load_config
+from App.metrics import metrics
+from App.querybudget import repeated_queries
 
 
 from App.controllers import (
     setup_jwt,
-    add_auth_context
+    add_auth_context,
+    clock_committer
 )
 
-from App.views import views, setup_admin
-
+# "web" serves requests; "cli" is for flask commands and skips everything only
+# requests use (blueprints, Flask-Admin, CORS, uploads, template hooks)
+PROFILES = ("web", "cli")
 
 
 def add_views(app):
+    from App.views import views
     for view in views:
         app.register_blueprint(view)
 
-def create_app(overrides={}):
-    app = Flask(__name__, static_url_path='/static')
-    load_config(app, overrides)
+# The web-only extensions are imported here rather than at module level, so the
+# cli profile never loads them
+def setup_web(app):
+    from flask_cors import CORS
+    from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
     CORS(app)
     add_auth_context(app)
     photos = UploadSet('photos', TEXT + DOCUMENTS + IMAGES)
     configure_uploads(app, photos)
+    metrics.init_app(app)
+    repeated_queries.init_app(app)
     add_views(app)
+
+def create_app(overrides={}, profile="web"):
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown app profile: {profile}")
+    app = Flask(__name__, static_url_path='/static')
+    load_config(app, overrides)
+    if profile == "web":
+        setup_web(app)
     init_db(app)
+    response_cache.init_app(app)
+    clock_committer.init_app(app)
     jwt = setup_jwt(app)
-    setup_admin(app)
+    if profile == "web":
+        from App.views import setup_admin
+        setup_admin(app)
     @jwt.invalid_token_loader
     @jwt.unauthorized_loader
     def custom_unauthorized_response(error):
         return render_template('401.html', error=error), 401
     app.app_context().push()
-    return app
\ No newline at end of file
+    return app
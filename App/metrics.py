@@ -0,0 +1,262 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request, current_app, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _labels(names, values):
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, values, amount=1):
+        self.series[values] = self.series.get(values, 0) + amount
+
+    def dump(self):
+        return [[list(values), total] for values, total in self.series.items()]
+
+    def load(self, items):
+        for values, total in items:
+            self.inc(tuple(values), total)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for values, total in sorted(self.series.items()):
+            yield f"{self.name}{{{_labels(self.labels, values)}}} {total}"
+
+
+# Bucket counts are kept per bucket and only made cumulative when rendered
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, values, value):
+        series = self.series.get(values)
+        if series is None:
+            # one count per bucket plus +Inf, then sum and count
+            series = self.series[values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def dump(self):
+        return [[list(values), series] for values, series in self.series.items()]
+
+    def load(self, items):
+        for values, series in items:
+            mine = self.series.setdefault(tuple(values), [0] * (len(self.buckets) + 1) + [0.0, 0])
+            for i, count in enumerate(series):
+                mine[i] += count
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for values, series in sorted(self.series.items()):
+            labels = _labels(self.labels, values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{{{labels}}} {series[-2]}"
+            yield f"{self.name}_count{{{labels}}} {series[-1]}"
+
+
+def new_series():
+    return {
+        "requests": Counter("http_requests_total", "Requests by endpoint, method and status",
+                            ("endpoint", "method", "status")),
+        "latency": Histogram("http_request_duration_seconds", "Time to build the response",
+                             ("endpoint", "method"), LATENCY_BUCKETS),
+        "sql": Histogram("http_request_sql_seconds", "Time spent in SQL per request",
+                         ("endpoint",), LATENCY_BUCKETS),
+        "queries": Histogram("http_request_sql_queries", "SQL statements per request",
+                             ("endpoint",), QUERY_BUCKETS),
+        "serialization": Histogram("http_request_serialization_seconds", "Time spent encoding JSON per request",
+                                   ("endpoint",), LATENCY_BUCKETS)
+    }
+
+
+# Per-request timings live in g.request_stats; after_request folds them into
+# the process-wide series.
+class RequestStats:
+    __slots__ = ("started", "queries", "sql", "serialization")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.serialization = 0.0
+
+
+def current_stats():
+    return g.get("request_stats") if has_request_context() else None
+
+def record_serialization(seconds):
+    stats = current_stats()
+    if stats is not None:
+        stats.serialization += seconds
+
+
+# jsonify() goes through the app's JSON provider, so this times it too
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        began = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_serialization(time.perf_counter() - began)
+
+
+# Each process keeps its own series. With METRICS_DIR set (gunicorn_config.py
+# sets one up), every worker also writes them to metrics-<pid>.json there at
+# most every METRICS_FLUSH_SECONDS (and as it exits) and /metrics adds up all
+# the files, so a scrape through any worker sees the whole server. Files of
+# workers that exited stay, keeping their counts in the totals.
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events_installed = False
+        self.directory = None
+        self.flush_interval = 1
+        self._flushed_at = 0.0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.series = new_series()
+
+    def init_app(self, app):
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+        self.directory = app.config.get("METRICS_DIR")
+        self.flush_interval = app.config.get("METRICS_FLUSH_SECONDS", 1)
+        app.json = TimedJSONProvider(app)
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        if not self._events_installed:
+            event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self.after_cursor_execute)
+            event.listen(Engine, "handle_error", self.handle_error)
+            self._events_installed = True
+
+    def start_request(self):
+        g.request_stats = RequestStats()
+
+    def finish_request(self, response):
+        stats = g.pop("request_stats", None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        # the route pattern, not the raw path, so ids don't explode the label set
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        with self._lock:
+            series = self.series
+            series["requests"].inc((endpoint, request.method, response.status_code))
+            series["latency"].observe((endpoint, request.method), elapsed)
+            series["sql"].observe((endpoint,), stats.sql)
+            series["queries"].observe((endpoint,), stats.queries)
+            series["serialization"].observe((endpoint,), stats.serialization)
+        # a disk write per request would cost more than the rest of the bookkeeping
+        if self.directory and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+        if (request.headers.get("X-Profile", "").strip().lower() not in ("", "0", "false", "off", "no")
+                and self.may_profile()):
+            response.headers["X-Profile"] = json.dumps({
+                "total_ms": round(elapsed * 1000, 3),
+                "sql_ms": round(stats.sql * 1000, 3),
+                "queries": stats.queries,
+                "serialization_ms": round(stats.serialization * 1000, 3)
+            }, separators=(",", ":"))
+        return response
+
+    # the breakdown is as revealing as /metrics, so the same callers get it,
+    # plus anyone on a debug server
+    def may_profile(self):
+        if current_app.debug:
+            return True
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+        from flask_jwt_extended.exceptions import JWTExtendedException
+        from jwt.exceptions import PyJWTError
+        from App.controllers.admin import check_metrics_access
+        try:
+            verify_jwt_in_request(optional=True)
+            check_metrics_access(get_jwt_identity())
+        except (PermissionError, JWTExtendedException, PyJWTError):
+            return False
+        return True
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if current_stats() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = current_stats()
+        started = conn.info.get("query_started")
+        if stats is not None and started:
+            stats.sql += time.perf_counter() - started.pop()
+            stats.queries += 1
+
+    # a failed statement never reaches after_cursor_execute
+    def handle_error(self, context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    # written to a temporary name and renamed, so readers never see half a file
+    def flush(self):
+        with self._lock:
+            self._flushed_at = time.monotonic()
+            snapshot = json.dumps({name: metric.dump() for name, metric in self.series.items()})
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            f.write(snapshot)
+        os.replace(path + ".tmp", path)
+
+    def collect(self):
+        if not self.directory:
+            return self.series
+        self.flush()
+        merged = new_series()
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, items in snapshot.items():
+                if name in merged:
+                    merged[name].load(items)
+        return merged
+
+    def render(self):
+        series = self.collect()
+        with self._lock:
+            lines = []
+            for metric in series.values():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
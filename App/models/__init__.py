@@ -3,4 +3,5 @@ from App.models.admin import Admin
 from App.models.staff import Staff
 from App.models.schedule import Schedule
 from App.models.shift import Shift 
-
+from App.models.version import DataVersion
+from App.models.shift_bucket import ShiftBucket
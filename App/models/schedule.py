@@ -1,4 +1,6 @@
 from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.orm import selectinload
 from App.database import db
 
 class Schedule(db.Model):
@@ -8,17 +10,29 @@ class Schedule(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     shifts = db.relationship("Shift", backref="schedule", lazy=True)
 
+    @classmethod
+    def query_with_shifts(cls):
+        # loads every schedule's shifts (and their staff) in one extra query instead of one per schedule
+        from .shift import Shift
+        return cls.query.options(selectinload(cls.shifts).joinedload(Shift.staff))
+
     def shift_count(self):
-        return len(self.shifts)
+        # count the loaded collection if we have it, otherwise count in SQL without loading shifts
+        if "shifts" not in inspect(self).unloaded:
+            return len(self.shifts)
+        from .shift import Shift
+        return db.session.scalar(db.select(db.func.count(Shift.id)).where(Shift.schedule_id == self.id))
 
     def get_json(self):
+        # the shifts are listed anyway, so count them instead of asking SQL
+        shifts = [shift.get_json() for shift in self.shifts]
         return {
             "id": self.id,
             "name": self.name,
             "created_at": self.created_at.isoformat(),
             "created_by": self.created_by,
-            "shift_count": self.shift_count(),
-            "shifts": [shift.get_json() for shift in self.shifts]
+            "shift_count": len(shifts),
+            "shifts": shifts
         }
 
 
@@ -2,9 +2,16 @@ from datetime import datetime
 from App.database import db
 
 class Shift(db.Model):
+    __table_args__ = (
+        # serves per-staff roster lookups and overlap checks as an index range scan
+        db.Index("ix_shift_staff_start_end", "staff_id", "start_time", "end_time"),
+        # matches the report's (start_time, id) ordering and keyset cursor
+        db.Index("ix_shift_start_id", "start_time", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     staff_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id"), nullable=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id"), nullable=True, index=True)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
     clock_in = db.Column(db.DateTime, nullable=True)
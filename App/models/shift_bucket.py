@@ -0,0 +1,26 @@
+from datetime import timedelta
+from App.database import db
+
+BUCKET = timedelta(hours=1)
+
+# One row per clock hour a shift overlaps, so "who is on at T" reads a single
+# hour's rows off the primary key instead of range-scanning every shift
+class ShiftBucket(db.Model):
+    hour = db.Column(db.DateTime, primary_key=True)
+    shift_id = db.Column(db.Integer, db.ForeignKey("shift.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    @staticmethod
+    def hour_of(time):
+        return time.replace(minute=0, second=0, microsecond=0)
+
+    # the hours overlapping [start_time, end_time)
+    @classmethod
+    def hours(cls, start_time, end_time):
+        hour = cls.hour_of(start_time)
+        while hour < end_time:
+            yield hour
+            hour += BUCKET
+
+    @classmethod
+    def rows(cls, shift_id, start_time, end_time):
+        return [{"hour": hour, "shift_id": shift_id} for hour in cls.hours(start_time, end_time)]
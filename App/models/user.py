@@ -1,13 +1,31 @@
+from functools import lru_cache
+from flask import current_app, has_app_context
 from werkzeug.security import check_password_hash, generate_password_hash
 from App.database import db
+from App.concurrency import run_blocking
 from datetime import datetime
 
+# PASSWORD_HASH_METHOD takes a Werkzeug method string such as "scrypt:32768:8:1"
+# or "pbkdf2:sha256:600000"; unset means Werkzeug's default
+def password_hash_options():
+    method = current_app.config.get("PASSWORD_HASH_METHOD") if has_app_context() else None
+    return {"method": method} if method else {}
+
+def hash_in_pool():
+    return current_app.config.get("PASSWORD_HASH_OFFLOAD", True) if has_app_context() else True
+
+# The "method:params" prefix Werkzeug writes for the given options
+@lru_cache(maxsize=8)
+def hash_prefix(method=None):
+    options = {"method": method} if method else {}
+    return generate_password_hash("", **options).split("$", 1)[0]
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(20), nullable=False, unique=True)
     password = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(10), nullable=False)
-    active_token = db.Column(db.String, nullable=True)
+    active_token = db.Column(db.String, nullable=True, index=True)
 
     __mapper_args__ = {
         "polymorphic_identity": "user",
@@ -27,9 +45,19 @@ class User(db.Model):
         }
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        options = password_hash_options()
+        if hash_in_pool():
+            self.password = run_blocking(generate_password_hash, password, **options)
+        else:
+            self.password = generate_password_hash(password, **options)
     
     def check_password(self, password):
+        if hash_in_pool():
+            return run_blocking(check_password_hash, self.password, password)
         return check_password_hash(self.password, password)
 
+    # True when the stored hash was made with different parameters than the current config
+    def password_needs_rehash(self):
+        return self.password.split("$", 1)[0] != hash_prefix(password_hash_options().get("method"))
+
 
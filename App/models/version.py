@@ -0,0 +1,7 @@
+from App.database import db
+
+# A counter per data set, bumped just after every write to it commits.
+# Readers compare it instead of re-running their queries (see the ETag views).
+class DataVersion(db.Model):
+    name = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
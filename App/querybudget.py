@@ -0,0 +1,107 @@
+import logging
+import os
+import re
+import traceback
+from functools import wraps
+
+from flask import g, request, current_app, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+HERE = os.path.abspath(__file__)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# Fails when the code inside runs more than max_queries statements, listing
+# them so the extra one is easy to spot. Counts every statement on the engine
+# (all engines by default) while active.
+#
+#   with QueryBudget(2): get_shift_report(admin.id)
+#   @QueryBudget(2)
+#   def test_report(): ...
+class QueryBudget:
+    def __init__(self, max_queries, engine=Engine):
+        self.max_queries = max_queries
+        self.engine = engine
+        self.statements = []
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self.record)
+        if exc_type is None and len(self.statements) > self.max_queries:
+            listing = "\n".join(f"  {i}. {' '.join(s.split())}" for i, s in enumerate(self.statements, 1))
+            raise QueryBudgetExceeded(
+                f"{len(self.statements)} queries, budget is {self.max_queries}:\n{listing}")
+        return False
+
+    # a fresh budget per call, so recursive or concurrent calls don't share a count
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with QueryBudget(self.max_queries, self.engine):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+# Literals and IN-list lengths vary between otherwise identical statements
+def query_shape(statement):
+    shape = _LITERALS.sub("?", " ".join(statement.split()))
+    return _LISTS.sub("(?)", shape)
+
+# The innermost frame in our own code, e.g. the get_json that touched a lazy relationship
+def call_site():
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(APP_ROOT) and filename != HERE:
+            return f"{os.path.relpath(filename, os.path.dirname(APP_ROOT))}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+# Dev-mode N+1 detector: logs a warning the first time a statement shape runs
+# more than QUERY_REPEAT_THRESHOLD times in one request. 0 turns it off; the
+# default is 10 in debug mode and off otherwise.
+class RepeatedQueryDetector:
+    def __init__(self):
+        self._events_installed = False
+
+    def init_app(self, app):
+        app.config.setdefault("QUERY_REPEAT_THRESHOLD", 10 if app.debug else 0)
+        app.before_request(self.start_request)
+        if not self._events_installed:
+            event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+            self._events_installed = True
+
+    # always reset: g can outlive a request when an app context is already pushed
+    def start_request(self):
+        g.query_shapes = {} if current_app.config["QUERY_REPEAT_THRESHOLD"] else None
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context():
+            return
+        shapes = g.get("query_shapes")
+        if shapes is None:
+            return
+        shape = query_shape(statement)
+        count = shapes[shape] = shapes.get(shape, 0) + 1
+        if count == current_app.config["QUERY_REPEAT_THRESHOLD"] + 1:
+            logger.warning("Same query run %d times in %s %s, from %s:\n%s",
+                           count, request.method, request.path, call_site(), statement)
+
+
+repeated_queries = RepeatedQueryDetector()
@@ -0,0 +1,115 @@
+import json
+import time
+from datetime import datetime
+from sqlalchemy import select, func
+
+from App.models import User, Shift, Schedule
+from App.metrics import record_serialization
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+
+# Output fields of each model mapped to the column that produces them. Lists are
+# built straight from the selected row tuples, and ?fields= narrows both the
+# SELECT and the encoded output.
+SHIFT_FIELDS = {
+    "id": Shift.id,
+    "staff_id": Shift.staff_id,
+    "staff_name": User.username,
+    "start_time": Shift.start_time,
+    "schedule_id": Shift.schedule_id,
+    "end_time": Shift.end_time,
+    "clock_in": Shift.clock_in,
+    "clock_out": Shift.clock_out
+}
+
+SCHEDULE_FIELDS = {
+    "id": Schedule.id,
+    "name": Schedule.name,
+    "created_at": Schedule.created_at,
+    "created_by": Schedule.created_by,
+    "creator": User.username,
+    "shift_count": (
+        select(func.count(Shift.id))
+        .where(Shift.schedule_id == Schedule.id)
+        .correlate(Schedule)
+        .scalar_subquery()
+    )
+}
+
+USER_FIELDS = {
+    "id": User.id,
+    "username": User.username,
+    "role": User.role
+}
+
+SHAPES = ("records", "columns")
+
+
+# "id,start_time" (or a list) -> validated field names; None means every field
+def parse_fields(available, fields=None):
+    if not fields:
+        return list(available)
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    names = [name.strip() for name in fields if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown) or 'none given'}")
+    return names
+
+def shift_select(names):
+    statement = select(*[SHIFT_FIELDS[name] for name in names]).select_from(Shift)
+    if "staff_name" in names:
+        statement = statement.outerjoin(User, User.id == Shift.staff_id)
+    return statement
+
+def schedule_select(names):
+    statement = select(*[SCHEDULE_FIELDS[name] for name in names]).select_from(Schedule)
+    if "creator" in names:
+        statement = statement.join(User, User.id == Schedule.created_by)
+    return statement
+
+def user_select(names):
+    return select(*[USER_FIELDS[name] for name in names]).select_from(User)
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+# A row as a dict with ISO date strings, the same shape get_json() produces
+def to_record(names, row):
+    return {name: _iso(value) for name, value in zip(names, row)}
+
+def to_records(names, rows):
+    return [to_record(names, row) for row in rows]
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# orjson writes datetimes as ISO 8601 itself, so rows go in untouched
+def dumps(payload):
+    began = time.perf_counter()
+    try:
+        if orjson is not None:
+            return orjson.dumps(payload).decode()
+        return json.dumps(payload, default=_default, separators=(",", ":"))
+    finally:
+        record_serialization(time.perf_counter() - began)
+
+# "records" is a list of objects; "columns" is one array per field, which drops
+# the repeated keys and roughly halves large payloads
+def encode(names, rows, shape="records"):
+    if shape == "records":
+        payload = [dict(zip(names, row)) for row in rows]
+    elif shape == "columns":
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        payload = {name: list(column) for name, column in zip(names, columns)}
+    else:
+        raise ValueError(f"Unknown shape: {shape}")
+    return dumps(payload)
@@ -0,0 +1,242 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+
+# Everything in slots from a midnight origin. required[t] is the staff wanted
+# in slot t; every shift is shift_slots long and starts on a multiple of
+# start_every. A staff member's shifts are at least rest_slots apart (so never
+# overlap) and add up to at most max_week_slots per week, counted by the week
+# each shift starts in. fixed maps a staff index to (first, end) slot ranges
+# they're already busy for (shifts in other schedules): they count toward the
+# weekly limit and need the same rest around them.
+class SchedulingProblem:
+    def __init__(self, required, staff_count, shift_slots, rest_slots, max_week_slots, week_slots,
+                 start_every=1, fixed=None):
+        self.required = np.asarray(required, dtype=np.int64)
+        self.staff_count = staff_count
+        self.shift_slots = shift_slots
+        self.rest_slots = rest_slots
+        self.max_week_slots = max_week_slots
+        self.week_slots = week_slots
+        self.start_every = start_every
+        self.fixed = fixed or {}
+
+
+# Greedy construction plus remove-and-reinsert local search, minimizing the
+# staff-slots short of demand and then the slots rostered.
+#
+# Each placement goes to the least-loaded staff member allowed to start
+# there; can_start[slot, staff] keeps that check to one row, since a shift at
+# s blocks every start within shift + rest of it. A placement's gain is the
+# still-short slots it covers, a windowed sum over a prefix sum of the short
+# mask.
+#
+# Local search: take a random shift out; if nothing goes short it was surplus
+# and stays out, otherwise it moves to the best start only if that covers more
+# than removing it uncovered.
+class ScheduleSolver:
+    def __init__(self, problem, seed=0):
+        self.problem = problem
+        self.slots = len(problem.required)
+        self.weeks = max(1, math.ceil(self.slots / problem.week_slots))
+        self.starts = np.arange(0, self.slots - problem.shift_slots + 1, problem.start_every)
+        self.headcount = np.zeros(self.slots, dtype=np.int64)
+        self.can_start = np.ones((self.slots, problem.staff_count), dtype=bool)
+        self.week_used = np.zeros((self.weeks, problem.staff_count), dtype=np.int64)
+        self.load = np.zeros(problem.staff_count, dtype=np.int64)
+        # no eligible staff at this start; cleared where a removal frees someone
+        self.no_staff = np.zeros(self.slots, dtype=bool)
+        self.shifts = {}
+        self.assigned = []
+        self.position = {}
+
+        # among equally good starts the earliest wins, which tiles the demand
+        # left to right instead of scattering overlapping shifts; a per-run
+        # order among equally loaded staff is what makes restarts differ
+        self.start_order = self.starts / (self.slots + 1)
+        rng = np.random.default_rng(seed)
+        self.staff_noise = rng.random(problem.staff_count) * 0.5
+        self.random = random.Random(seed)
+
+        for staff, ranges in problem.fixed.items():
+            for first, end in ranges:
+                self._block(staff, first, end)
+                if 0 <= first < self.slots:
+                    self.week_used[first // problem.week_slots, staff] += end - first
+
+    def _block(self, staff, first, end):
+        p = self.problem
+        self.can_start[max(0, first - p.shift_slots - p.rest_slots + 1):max(0, end + p.rest_slots), staff] = False
+
+    def _rebuild(self, staff):
+        self.can_start[:, staff] = True
+        for first, end in self.problem.fixed.get(staff, ()):
+            self._block(staff, first, end)
+        for start in self.shifts.get(staff, ()):
+            self._block(staff, start, start + self.problem.shift_slots)
+
+    def shortfall(self):
+        return int(np.maximum(self.problem.required - self.headcount, 0).sum())
+
+    def pick_staff(self, start):
+        p = self.problem
+        eligible = self.can_start[start] & (self.week_used[start // p.week_slots] <= p.max_week_slots - p.shift_slots)
+        if not eligible.any():
+            return None
+        return int(np.argmin(np.where(eligible, self.load + self.staff_noise, np.inf)))
+
+    # (start, staff, slots it would cover) for the best placement, or None
+    def best_move(self):
+        if not len(self.starts):
+            return None
+        short = np.concatenate(([0], np.cumsum(self.problem.required > self.headcount)))
+        gains = short[self.starts + self.problem.shift_slots] - short[self.starts]
+        score = np.where(self.no_staff[self.starts] | (gains <= 0), -1.0, gains - self.start_order)
+        while True:
+            i = int(np.argmax(score))
+            if score[i] < 0:
+                return None
+            start = int(self.starts[i])
+            staff = self.pick_staff(start)
+            if staff is not None:
+                return start, staff, int(gains[i])
+            self.no_staff[start] = True
+            score[i] = -1.0
+
+    def assign(self, staff, start):
+        p = self.problem
+        self.headcount[start:start + p.shift_slots] += 1
+        self._block(staff, start, start + p.shift_slots)
+        self.week_used[start // p.week_slots, staff] += p.shift_slots
+        self.load[staff] += p.shift_slots
+        self.shifts.setdefault(staff, []).append(start)
+        self.position[(staff, start)] = len(self.assigned)
+        self.assigned.append((staff, start))
+
+    def unassign(self, staff, start):
+        p = self.problem
+        self.headcount[start:start + p.shift_slots] -= 1
+        self.week_used[start // p.week_slots, staff] -= p.shift_slots
+        self.load[staff] -= p.shift_slots
+        self.shifts[staff].remove(start)
+        # swap-remove from the flat list used for random picks
+        index = self.position.pop((staff, start))
+        last = self.assigned.pop()
+        if index < len(self.assigned):
+            self.assigned[index] = last
+            self.position[last] = index
+        self._rebuild(staff)
+        # this staff member may now fit starts near the shift and anywhere in its week
+        week = start // p.week_slots
+        self.no_staff[max(0, start - p.shift_slots - p.rest_slots + 1):start + p.shift_slots + p.rest_slots] = False
+        self.no_staff[max(0, week * p.week_slots - p.shift_slots):(week + 1) * p.week_slots] = False
+
+    # Gain-first: repeatedly the best single placement. Wastes least when
+    # staff hours, not coverage, are what runs out.
+    def fill(self, deadline):
+        while time.perf_counter() < deadline:
+            move = self.best_move()
+            if move is None:
+                return
+            self.assign(move[1], move[0])
+
+    # Left-to-right sweep: cover the earliest short slot with the latest start
+    # that still covers it (so the shift reaches as far right as it can), the
+    # optimal order for fixed-length shifts when staff are free. Slots no
+    # eligible staff member can cover are skipped.
+    def sweep(self, deadline):
+        p = self.problem
+        skipped = np.zeros(self.slots, dtype=bool)
+        while time.perf_counter() < deadline:
+            short = (p.required > self.headcount) & ~skipped
+            slot = int(np.argmax(short))
+            if not short[slot]:
+                return
+            first = np.searchsorted(self.starts, slot - p.shift_slots + 1)
+            last = np.searchsorted(self.starts, slot, side="right")
+            for start in self.starts[first:last][::-1]:
+                staff = self.pick_staff(int(start))
+                if staff is not None:
+                    self.assign(staff, int(start))
+                    break
+            else:
+                skipped[slot] = True
+
+    def improve(self, deadline):
+        stale = 0
+        while self.assigned and stale < max(200, 2 * len(self.assigned)) and time.perf_counter() < deadline:
+            if self.shortfall() == 0:
+                # nothing left to cover, so only surplus shifts can go
+                return self.drop_surplus()
+            if (self.headcount <= self.problem.required).all():
+                # every rostered slot is needed: a move can't cover more than it uncovers
+                return
+            staff, start = self.assigned[self.random.randrange(len(self.assigned))]
+            end = start + self.problem.shift_slots
+            loss = int(np.count_nonzero(self.headcount[start:end] <= self.problem.required[start:end]))
+            self.unassign(staff, start)
+            if loss == 0:
+                stale = 0
+                continue
+            move = self.best_move()
+            if move is not None and move[2] > loss:
+                self.assign(move[1], move[0])
+                stale = 0
+            else:
+                self.assign(staff, start)
+                stale += 1
+
+    def drop_surplus(self):
+        p = self.problem
+        for staff, start in sorted(self.assigned, key=lambda shift: -shift[1]):
+            end = start + p.shift_slots
+            if (self.headcount[start:end] > p.required[start:end]).all():
+                self.unassign(staff, start)
+
+    def result(self, seed):
+        return {
+            "seed": seed,
+            "shifts": sorted(self.assigned, key=lambda shift: (shift[1], shift[0])),
+            "shortfall_slots": self.shortfall(),
+            "rostered_slots": int(self.load.sum())
+        }
+
+
+def _cost(solver):
+    return solver.shortfall(), int(solver.load.sum())
+
+# Both constructions, then local search on the better one with the time left
+def solve(problem, seed=0, time_budget=5.0):
+    deadline = time.perf_counter() + time_budget
+    built = []
+    for construct in (ScheduleSolver.sweep, ScheduleSolver.fill):
+        solver = ScheduleSolver(problem, seed)
+        construct(solver, deadline)
+        built.append(solver)
+    solver = min(built, key=_cost)
+    solver.improve(deadline)
+    # surplus shifts taken out during the search free capacity to fill again
+    solver.fill(deadline)
+    return solver.result(seed)
+
+# Independent restarts (different seeds), optionally in a process pool, each
+# with its share of the time budget; returns the best result. Workers are
+# spawned rather than forked so they don't inherit the server's threads and
+# connections.
+def solve_restarts(problem, restarts=1, processes=1, time_budget=5.0):
+    restarts = max(1, restarts)
+    # more workers than cores would only share the same budget
+    processes = max(1, min(processes, restarts, os.cpu_count() or 1))
+    each = time_budget / math.ceil(restarts / processes)
+    if processes > 1:
+        with ProcessPoolExecutor(processes, mp_context=get_context("spawn")) as pool:
+            results = list(pool.map(solve, [problem] * restarts, range(restarts), [each] * restarts))
+    else:
+        results = [solve(problem, seed, each) for seed in range(restarts)]
+    return min(results, key=lambda r: (r["shortfall_slots"], r["rostered_slots"]))
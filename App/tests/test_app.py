@@ -1,9 +1,16 @@
-import os, tempfile, pytest, logging, unittest
+import os, sys, subprocess, tempfile, pytest, logging, unittest, json, csv, gzip, io, asyncio
+from sqlalchemy import event
+from flask import current_app
+from flask_jwt_extended import create_access_token
 from werkzeug.security import check_password_hash, generate_password_hash
 from App.main import create_app
-from App.database import db, create_db
+from App.database import db, create_db, pool_options
 from datetime import datetime, timedelta
-from App.models import User, Schedule, Shift
+from App.models import User, Schedule, Shift, ShiftBucket
+from App.cache import response_cache, LocalBackend, RedisBackend, NullBackend, ROSTER_CACHE
+from App.serializers import SHIFT_FIELDS
+from App.metrics import metrics
+from App.querybudget import QueryBudget, QueryBudgetExceeded, query_shape
 from App.controllers import (
     create_user,
     get_all_users_json,
@@ -15,7 +22,30 @@ from App.controllers import (
     get_combined_roster,
     clock_in,
     clock_out,
-    get_shift 
+    get_shift,
+    get_shift_report_page,
+    stream_shift_report,
+    get_schedule,
+    get_all_schedules,
+    schedule_shifts,
+    get_user_identity,
+    identity_cache,
+    login,
+    get_schedule_summaries,
+    find_batch_overlaps,
+    get_combined_roster_json,
+    get_shift_report_json,
+    export_shifts,
+    count_shift_export,
+    get_hours_report,
+    clock_committer,
+    get_data_version,
+    bump_data_version,
+    get_on_shift,
+    get_on_shift_json,
+    reindex_shifts,
+    get_schedule_coverage,
+    generate_schedule
 )
 
 
@@ -368,4 +398,1079 @@ class UsersIntegrationTests(unittest.TestCase):
             get_combined_roster(admin.id)
 
         with self.assertRaises(PermissionError):
-            get_shift_report(staff.id)
\ No newline at end of file
+            get_shift_report(staff.id)
+
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+def create_report_shifts(count):
+    admin = create_user("reportadmin", "adminpass", "admin")
+    staff = create_user("reportstaff", "staffpass", "staff")
+    schedule = Schedule(name="Report Schedule", created_by=admin.id)
+    db.session.add(schedule)
+    db.session.commit()
+    start = datetime(2025, 11, 1, 8, 0, 0)
+    for day in range(count):
+        schedule_shift(admin.id, staff.id, schedule.id,
+                       start + timedelta(days=day),
+                       start + timedelta(days=day, hours=8))
+    return admin, staff
+
+def test_shift_report_keyset_pages():
+    admin, _ = create_report_shifts(5)
+    first = get_shift_report_page(admin.id, limit=2)
+    assert len(first["shifts"]) == 2
+    second = get_shift_report_page(admin.id, limit=2, after=first["next"])
+    third = get_shift_report_page(admin.id, limit=2, after=second["next"])
+    assert third["next"] is None
+    pages = first["shifts"] + second["shifts"] + third["shifts"]
+    assert pages == get_shift_report(admin.id)
+
+def test_shift_report_invalid_cursor():
+    admin, _ = create_report_shifts(1)
+    with pytest.raises(ValueError):
+        get_shift_report_page(admin.id, after="not-a-cursor")
+
+def test_stream_shift_report_permission():
+    _, staff = create_report_shifts(1)
+    with pytest.raises(PermissionError):
+        stream_shift_report(staff.id)
+
+def test_shift_report_stream_endpoint(empty_db):
+    admin, _ = create_report_shifts(3)
+    response = empty_db.get("/shiftReport?stream=1", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True)) == get_shift_report(admin.id)
+
+    response = empty_db.get("/shiftReport?limit=2", headers=auth_headers(admin))
+    assert len(response.get_json()["shifts"]) == 2
+    assert response.get_json()["next"] is not None
+
+
+@pytest.fixture
+def query_budget():
+    return lambda max_queries: QueryBudget(max_queries, db.engine)
+
+def add_staff_shifts(admin, schedule, count, prefix):
+    start = datetime(2025, 12, 1, 8, 0, 0)
+    for i in range(count):
+        staff = create_user(f"{prefix}{i}", "staffpass", "staff")
+        schedule_shift(admin.id, staff.id, schedule.id, start, start + timedelta(hours=8))
+
+def test_serialization_query_count_is_constant(query_budget):
+    admin = create_user("countadmin", "adminpass", "admin")
+    staff = create_user("countstaff", "staffpass", "staff")
+    schedule = Schedule(name="Count Schedule", created_by=admin.id)
+    db.session.add(schedule)
+    db.session.commit()
+
+    # the same budget with 2 and 12 shifts: nothing runs a query per row
+    def run_all():
+        db.session.expire_all()
+        with query_budget(11):
+            get_shift_report(admin.id)
+            get_combined_roster(staff.id)
+            get_schedule(schedule.id).get_json()
+            [s.get_json() for s in get_all_schedules()]
+
+    add_staff_shifts(admin, schedule, 2, "few")
+    run_all()
+    add_staff_shifts(admin, schedule, 10, "many")
+    run_all()
+
+
+def test_roster_filters_by_staff_and_window(empty_db):
+    admin, staff = create_report_shifts(5)
+    other = create_user("otherstaff", "staffpass", "staff")
+    schedule = Schedule.query.first()
+    schedule_shift(admin.id, other.id, schedule.id,
+                   datetime(2025, 11, 2, 8, 0, 0), datetime(2025, 11, 2, 16, 0, 0))
+
+    assert len(get_combined_roster(staff.id)) == 6
+    mine = get_combined_roster(staff.id, for_staff_id=staff.id)
+    assert len(mine) == 5
+    assert all(s["staff_id"] == staff.id for s in mine)
+
+    window = get_combined_roster(staff.id, for_staff_id=staff.id,
+                                 start=datetime(2025, 11, 2), end=datetime(2025, 11, 4))
+    assert [s["start_time"] for s in window] == ["2025-11-02T08:00:00", "2025-11-03T08:00:00"]
+
+    response = empty_db.get(f"/staff/roster?staff_id={other.id}&from=2025-11-01&to=2025-11-30",
+                            headers=auth_headers(staff))
+    assert response.status_code == 200
+    assert [s["staff_id"] for s in response.get_json()] == [other.id]
+
+
+def test_schedule_shifts_batch_reports_row_errors(query_budget):
+    admin, staff = create_report_shifts(0)
+    schedule = Schedule.query.first()
+    rows = [
+        {"staff_id": staff.id, "schedule_id": schedule.id,
+         "start_time": "2025-12-01T08:00:00", "end_time": "2025-12-01T16:00:00"},
+        {"staff_id": admin.id, "schedule_id": schedule.id,
+         "start_time": "2025-12-02T08:00:00", "end_time": "2025-12-02T16:00:00"},
+        {"staff_id": staff.id, "schedule_id": 999,
+         "start_time": "2025-12-03T08:00:00", "end_time": "2025-12-03T16:00:00"},
+        {"staff_id": staff.id, "schedule_id": schedule.id,
+         "start_time": "next tuesday", "end_time": "2025-12-04T16:00:00"},
+        {"staff_id": str(staff.id), "schedule_id": str(schedule.id),
+         "start_time": "2025-12-05 08:00:00", "end_time": "2025-12-05 16:00:00"},
+    ]
+    with query_budget(10) as budget:
+        result = schedule_shifts(admin.id, rows)
+    assert [e["row"] for e in result["errors"]] == [2, 3, 4]
+    assert result["errors"][0]["error"] == "Invalid staff member"
+    assert result["errors"][1]["error"] == "Invalid schedule ID"
+    assert len(result["created"]) == 2
+    assert sum(s.lstrip().startswith("INSERT INTO shift ") for s in budget.statements) == 1
+    assert sum(s.lstrip().startswith("INSERT INTO shift_bucket") for s in budget.statements) == 1
+    assert sorted(get_shift(i).start_time.day for i in result["created"]) == [1, 5]
+
+def test_schedule_shifts_requires_admin():
+    _, staff = create_report_shifts(0)
+    with pytest.raises(PermissionError):
+        schedule_shifts(staff.id, [])
+
+def test_create_shifts_endpoint(empty_db):
+    admin, staff = create_report_shifts(0)
+    schedule = Schedule.query.first()
+    body = [{"staffID": staff.id, "scheduleID": schedule.id,
+             "start_time": f"2025-12-0{day}T08:00:00", "end_time": f"2025-12-0{day}T16:00:00"}
+            for day in range(1, 4)]
+    response = empty_db.post("/createShifts", json={"shifts": body}, headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert len(response.get_json()["created"]) == 3
+    assert response.get_json()["errors"] == []
+
+    response = empty_db.post("/createShifts", json={"shifts": "nope"}, headers=auth_headers(admin))
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def process_identity_cache():
+    identity_cache.configure(ttl=60)
+    yield identity_cache
+    identity_cache.configure(ttl=0)
+
+def test_role_checked_endpoint_skips_user_queries(empty_db, process_identity_cache, query_budget):
+    admin, _ = create_report_shifts(2)
+    empty_db.get("/shiftReport?limit=1", headers=auth_headers(admin))
+    with query_budget(2) as budget:
+        response = empty_db.get("/shiftReport?limit=1", headers=auth_headers(admin))
+    assert response.status_code == 200
+    # the JWT user and the role check come from the cache
+    assert not any("FROM user" in s for s in budget.statements)
+
+def test_identity_cache_invalidated_on_update(process_identity_cache, query_budget):
+    user = create_user("cached", "cachedpass", "staff")
+    assert get_user_identity(user.id).username == "cached"
+    update_user(user.id, "renamed")
+    with query_budget(1):
+        assert get_user_identity(user.id).username == "renamed"
+        assert get_user_identity(str(user.id)).role == "staff"
+
+
+def test_login_rehashes_when_hash_method_changes():
+    user = create_user("rehash", "rehashpass", "staff")
+    old_hash = user.password
+    current_app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    try:
+        assert user.password_needs_rehash()
+        assert login("rehash", "rehashpass") is not None
+        user = get_user(user.id)
+        assert user.password != old_hash
+        assert user.password.startswith("pbkdf2:sha256:1000$")
+        assert not user.password_needs_rehash()
+        assert login("rehash", "wrongpass") is None
+        assert login("rehash", "rehashpass") is not None
+    finally:
+        current_app.config.pop("PASSWORD_HASH_METHOD")
+
+
+def test_benchmark_suite_runs():
+    from benchmarks.suite import run_suite, compare
+    report = run_suite(staff=3, schedules=1, shifts=20, repeat=2, slow_repeat=1)
+    assert "http.shift_report" in report["results"]
+    assert all(result["median_ms"] > 0 for result in report["results"].values())
+    assert compare(report, report, 0.5) == []
+    slower = {"params": report["params"], "results": {
+        name: dict(result, median_ms=result["median_ms"] * 3) for name, result in report["results"].items()
+    }}
+    assert len(compare(slower, report, 0.5)) == len(report["results"])
+
+
+def test_schedule_summaries_count_in_sql(empty_db, query_budget):
+    admin, staff = create_report_shifts(4)
+    empty_schedule = Schedule(name="Empty", created_by=admin.id)
+    db.session.add(empty_schedule)
+    db.session.commit()
+    admin_id = admin.id
+
+    with query_budget(2):
+        summaries = get_schedule_summaries(admin_id)
+    assert [(s["name"], s["creator"], s["shift_count"]) for s in summaries] == [
+        ("Report Schedule", "reportadmin", 4), ("Empty", "reportadmin", 0)]
+
+    schedule = db.session.get(Schedule, summaries[0]["id"])
+    assert schedule.shift_count() == 4
+    assert "shifts" in db.inspect(schedule).unloaded
+    # the full JSON loads the shifts once and counts those
+    with query_budget(2):
+        assert schedule.get_json()["shift_count"] == 4
+
+    response = empty_db.get("/schedules", headers=auth_headers(admin))
+    assert response.get_json() == summaries
+    assert empty_db.get("/schedules", headers=auth_headers(staff)).status_code == 403
+
+
+def test_schedule_shift_rejects_overlaps_and_bad_times():
+    admin, staff = create_report_shifts(1)  # 2025-11-01 08:00-16:00
+    schedule = Schedule.query.first()
+    with pytest.raises(ValueError) as e:
+        schedule_shift(admin.id, staff.id, schedule.id,
+                       datetime(2025, 11, 1, 15, 0, 0), datetime(2025, 11, 1, 20, 0, 0))
+    assert str(e.value) == "Shift overlaps an existing shift for this staff member"
+    with pytest.raises(ValueError) as e:
+        schedule_shift(admin.id, staff.id, schedule.id,
+                       datetime(2025, 11, 2, 8, 0, 0), datetime(2025, 11, 2, 8, 0, 0))
+    assert str(e.value) == "Shift end time must be after start time"
+    # back-to-back shifts do not overlap
+    shift = schedule_shift(admin.id, staff.id, schedule.id,
+                           datetime(2025, 11, 1, 16, 0, 0), datetime(2025, 11, 1, 20, 0, 0))
+    assert shift.id is not None
+
+def test_schedule_shifts_batch_rejects_overlaps():
+    admin, staff = create_report_shifts(1)  # 2025-11-01 08:00-16:00
+    schedule = Schedule.query.first()
+    def row(day, start, end):
+        return {"staff_id": staff.id, "schedule_id": schedule.id,
+                "start_time": datetime(2025, 11, day, start), "end_time": datetime(2025, 11, day, end)}
+    result = schedule_shifts(admin.id, [
+        row(1, 12, 18),   # clashes with the existing shift
+        row(2, 8, 16),
+        row(2, 14, 20),   # clashes with row 2
+        row(2, 16, 22),   # back-to-back with row 2
+        row(3, 10, 9),
+    ])
+    assert result["errors"] == [
+        {"row": 1, "error": "Shift overlaps an existing shift for this staff member"},
+        {"row": 3, "error": "Shift overlaps row 2"},
+        {"row": 5, "error": "Shift end time must be after start time"},
+    ]
+    assert len(result["created"]) == 2
+
+def test_find_batch_overlaps_sweep():
+    start = datetime(2026, 1, 1)
+    proposed = [(i + 1, {"staff_id": i % 50, "start_time": start + timedelta(hours=8 * (i // 50)),
+                         "end_time": start + timedelta(hours=8 * (i // 50) + 8)}) for i in range(5000)]
+    existing = [(7, start - timedelta(hours=8), start + timedelta(hours=1))]
+    conflicts = find_batch_overlaps(proposed, existing)
+    assert conflicts == {8: "Shift overlaps an existing shift for this staff member"}
+
+
+def test_roster_etag_returns_304_until_shift_data_changes(empty_db, query_budget):
+    admin, staff = create_report_shifts(2)
+    shift_id = get_combined_roster(staff.id)[0]["id"]
+    headers = auth_headers(staff)
+    first = empty_db.get("/staff/roster", headers=headers)
+    etag = first.headers["ETag"]
+
+    with query_budget(2) as budget:
+        cached = empty_db.get("/staff/roster", headers=dict(headers, **{"If-None-Match": etag}))
+    assert cached.status_code == 304
+    assert not any("FROM shift" in s for s in budget.statements)
+
+    # other filters are a different resource
+    filtered = empty_db.get(f"/staff/roster?staff_id={staff.id}", headers=dict(headers, **{"If-None-Match": etag}))
+    assert filtered.status_code == 200
+
+    clock_in(staff.id, shift_id)
+    changed = empty_db.get("/staff/roster", headers=dict(headers, **{"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()[0]["clock_in"] is not None
+
+    report = empty_db.get("/shiftReport", headers=auth_headers(admin))
+    assert empty_db.get("/shiftReport", headers=dict(auth_headers(admin), **{
+        "If-None-Match": report.headers["ETag"]})).status_code == 304
+
+
+@pytest.fixture
+def cache_backend():
+    backend = LocalBackend(maxsize=8)
+    response_cache.backend = backend
+    response_cache.reset_stats()
+    yield backend
+    response_cache.backend = NullBackend()
+    response_cache.reset_stats()
+
+def exercise_roster_cache(staff, shift_id):
+    first = get_combined_roster_json(staff.id)
+    with QueryBudget(1, db.engine) as budget:
+        assert get_combined_roster_json(staff.id) == first
+    assert not any("FROM shift" in s for s in budget.statements)
+    assert get_combined_roster_json(staff.id, for_staff_id=staff.id) == first  # separate key, a miss
+    assert response_cache.stats()["hits"] == {"roster": 1}
+    assert response_cache.stats()["misses"] == {"roster": 2}
+
+    clock_in(staff.id, shift_id)
+    assert json.loads(get_combined_roster_json(staff.id))[0]["clock_in"] is not None
+    assert response_cache.stats()["misses"] == {"roster": 3}
+
+def test_local_response_cache_hits_and_invalidation(cache_backend):
+    admin, staff = create_report_shifts(2)
+    exercise_roster_cache(staff, get_combined_roster(staff.id)[0]["id"])
+    assert json.loads(get_shift_report_json(admin.id)) == get_shift_report(admin.id)
+    with pytest.raises(PermissionError):
+        get_combined_roster_json(admin.id)
+
+def test_orm_writes_clear_cached_responses(empty_db, cache_backend):
+    admin, staff = create_report_shifts(1)
+    first = empty_db.get("/staff/roster", headers=auth_headers(staff))
+    assert first.get_json()[0]["staff_name"] == "reportstaff"
+    # a rename through the ORM (e.g. Flask-Admin) with no controller involved
+    db.session.get(User, staff.id).username = "renamedstaff"
+    db.session.commit()
+    second = empty_db.get("/staff/roster", headers=dict(auth_headers(staff), **{"If-None-Match": first.headers["ETag"]}))
+    assert second.status_code == 200 and second.headers["ETag"] != first.headers["ETag"]
+    assert second.get_json()[0]["staff_name"] == "renamedstaff"
+    assert json.loads(get_shift_report_json(admin.id))[0]["staff_name"] == "renamedstaff"
+
+def test_local_backend_is_bounded_lru():
+    backend = LocalBackend(maxsize=2)
+    backend.set("roster:0:a", "1")
+    backend.set("roster:0:b", "2")
+    backend.get("roster:0:a")
+    backend.set("roster:0:c", "3")
+    assert backend.get("roster:0:b") is None
+    assert backend.get("roster:0:a") == "1"
+    backend.invalidate("roster")
+    assert backend.size() == 0 and backend.generation("roster") == 1
+
+def test_redis_response_cache_shares_entries():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    response_cache.backend = RedisBackend(fakeredis.FakeRedis(server=server))
+    try:
+        admin, staff = create_report_shifts(2)
+        exercise_roster_cache(staff, get_combined_roster(staff.id)[0]["id"])
+        # a second worker with its own client sees the same entries and generations
+        other = RedisBackend(fakeredis.FakeRedis(server=server))
+        generation = other.generation(ROSTER_CACHE)
+        assert other.get(f"roster:{generation}:" + json.dumps([None, None, None, list(SHIFT_FIELDS), "records"])) is not None
+    finally:
+        response_cache.backend = NullBackend()
+        response_cache.reset_stats()
+
+def test_cache_stats_endpoint(empty_db, cache_backend):
+    admin, staff = create_report_shifts(1)
+    empty_db.get("/shiftReport", headers=auth_headers(admin))
+    empty_db.get("/shiftReport", headers=auth_headers(admin))
+    stats = empty_db.get("/cache/stats", headers=auth_headers(admin)).get_json()
+    assert stats["backend"] == "LocalBackend"
+    assert stats["misses"] == {"report": 1}
+    assert stats["hits"] == {"report": 1}
+    assert empty_db.get("/cache/stats", headers=auth_headers(staff)).status_code == 403
+
+def test_sparse_fields_narrow_the_select(empty_db, query_budget):
+    admin, staff = create_report_shifts(3)
+    staff_id = staff.id
+    with query_budget(2) as budget:
+        roster = json.loads(get_combined_roster_json(staff_id, fields="id,start_time"))
+    assert [set(row) for row in roster] == [{"id", "start_time"}] * 3
+    shift_select = [s for s in budget.statements if "FROM shift" in s][0]
+    assert "end_time" not in shift_select and "JOIN user" not in shift_select
+    assert roster[0]["start_time"] == "2025-11-01T08:00:00"
+
+    response = empty_db.get("/shiftReport?fields=id,staff_name&shape=columns", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert response.get_json()["staff_name"] == ["reportstaff"] * 3
+
+def test_columnar_shape_matches_records():
+    admin, staff = create_report_shifts(2)
+    records = json.loads(get_shift_report_json(admin.id))
+    columns = json.loads(get_shift_report_json(admin.id, shape="columns"))
+    assert list(columns) == list(records[0])
+    assert columns["id"] == [row["id"] for row in records]
+    assert columns["clock_in"] == [None, None]
+    assert records == get_shift_report(admin.id)
+
+def test_unknown_fields_and_shapes_are_rejected(empty_db):
+    admin, staff = create_report_shifts(1)
+    assert empty_db.get("/staff/roster?fields=id,password", headers=auth_headers(staff)).status_code == 403
+    assert empty_db.get("/shiftReport?shape=xml", headers=auth_headers(admin)).status_code == 403
+    assert empty_db.get("/schedules?fields=shift_count", headers=auth_headers(admin)).get_json() == [{"shift_count": 1}]
+    assert empty_db.get("/api/users?fields=password").status_code == 400
+    assert empty_db.get("/api/users?fields=username&shape=columns").get_json() == {"username": ["reportadmin", "reportstaff"]}
+
+def test_export_shifts_csv_and_ndjson_with_filters():
+    admin, staff = create_report_shifts(5)
+    chunks = list(export_shifts(admin.id, "csv", batch_size=2))
+    assert len(chunks) == 4  # header plus three batches
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert [row["start_time"] for row in rows][:2] == ["2025-11-01T08:00:00", "2025-11-02T08:00:00"]
+    assert rows[0]["staff_name"] == "reportstaff" and rows[0]["clock_in"] == ""
+
+    filters = dict(start=datetime(2025, 11, 2), end=datetime(2025, 11, 4), staff_id=staff.id)
+    lines = "".join(export_shifts(admin.id, "ndjson", fields="id,start_time", **filters)).splitlines()
+    assert [json.loads(line)["start_time"] for line in lines] == ["2025-11-02T08:00:00", "2025-11-03T08:00:00"]
+    assert count_shift_export(admin.id, **filters) == 2
+    assert list(export_shifts(admin.id, "csv", schedule_id=999)) == ["id,staff_id,staff_name,start_time,schedule_id,end_time,clock_in,clock_out\n"]
+
+    with pytest.raises(PermissionError):
+        export_shifts(staff.id)
+    with pytest.raises(ValueError):
+        export_shifts(admin.id, "xlsx")
+
+def test_export_shifts_endpoint_gzips_on_request(empty_db):
+    admin, staff = create_report_shifts(3)
+    plain = empty_db.get("/export/shifts?format=ndjson", headers=auth_headers(admin))
+    assert plain.status_code == 200 and plain.mimetype == "application/x-ndjson"
+    assert len(plain.get_data(as_text=True).splitlines()) == 3
+
+    headers = dict(auth_headers(admin), **{"Accept-Encoding": "gzip"})
+    packed = empty_db.get("/export/shifts", headers=headers)
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(packed.data).decode().count("\n") == 4
+    assert empty_db.get("/export/shifts", headers=auth_headers(staff)).status_code == 403
+
+def test_hours_report_aggregates_in_sql(empty_db, query_budget):
+    admin, staff = create_report_shifts(8)  # 2025-11-01 (a Saturday) to 11-08, 08:00-16:00
+    shifts = Shift.query.order_by(Shift.start_time).all()
+    # on time, 30 minutes late, left an hour early, never clocked in
+    shifts[0].clock_in, shifts[0].clock_out = datetime(2025, 11, 1, 8), datetime(2025, 11, 1, 16)
+    shifts[1].clock_in, shifts[1].clock_out = datetime(2025, 11, 2, 8, 30), datetime(2025, 11, 2, 16)
+    shifts[2].clock_in, shifts[2].clock_out = datetime(2025, 11, 3, 8), datetime(2025, 11, 3, 15)
+    db.session.commit()
+    admin_id = admin.id
+
+    with query_budget(2) as budget:
+        weeks = get_hours_report(admin_id, "week")
+    assert len([s for s in budget.statements if "FROM shift" in s]) == 1
+    assert [(w["period"], w["shifts"]) for w in weeks] == [("2025-10-27", 2), ("2025-11-03", 6)]
+    assert weeks[0]["scheduled_hours"] == 16 and weeks[0]["worked_hours"] == 15.5
+    assert weeks[0]["late_arrivals"] == 1 and weeks[1]["early_departures"] == 1
+
+    days = get_hours_report(admin_id, start=datetime(2025, 11, 2), end=datetime(2025, 11, 4), grace=30)
+    assert [(d["period"], d["worked_hours"], d["late_arrivals"]) for d in days] == [("2025-11-02", 7.5, 0), ("2025-11-03", 7.0, 0)]
+    assert days[1]["early_departures"] == 1
+
+    response = empty_db.get("/reports/hours?group=week&staff_id=%d" % staff.id, headers=auth_headers(admin))
+    assert response.status_code == 200 and len(response.get_json()) == 2
+    assert empty_db.get("/reports/hours?group=month", headers=auth_headers(admin)).status_code == 403
+    assert empty_db.get("/reports/hours", headers=auth_headers(staff)).status_code == 403
+
+def test_clock_in_is_a_single_update(query_budget):
+    admin, staff = create_report_shifts(1)
+    staff_id, shift_id = staff.id, Shift.query.first().id
+    with query_budget(3) as budget:
+        shift = clock_in(staff_id, shift_id)
+        shift.get_json()
+    assert not any(s.startswith("SELECT") and "FROM shift" in s for s in budget.statements)
+    assert len([s for s in budget.statements if s.startswith("UPDATE shift")]) == 1
+    assert shift.clock_in is not None and shift.staff_id == staff_id
+    assert db.session.get(Shift, shift_id).clock_in == shift.clock_in
+
+def test_data_version_bumps_after_commit():
+    admin, staff = create_report_shifts(1)
+    shift_id = Shift.query.first().id
+    version = get_data_version()
+    # the writer's transaction never touches the version row, it's bumped after the commit
+    events = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        events.append(statement)
+    def committed(conn):
+        events.append("COMMIT")
+    event.listen(db.engine, "before_cursor_execute", record)
+    event.listen(db.engine, "commit", committed)
+    try:
+        clock_in(staff.id, shift_id)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+        event.remove(db.engine, "commit", committed)
+    first_commit = events.index("COMMIT")
+    assert any(s.startswith("UPDATE shift") for s in events[:first_commit])
+    assert not any("data_version" in s for s in events[:first_commit])
+    assert any("data_version" in s for s in events[first_commit:])
+    assert get_data_version() == version + 1
+
+    # a rolled back write doesn't bump it
+    bump_data_version()
+    db.session.rollback()
+    db.session.commit()
+    assert get_data_version() == version + 1
+
+    # ORM edits (e.g. through Flask-Admin) are picked up without a call
+    db.session.get(Shift, shift_id).end_time += timedelta(hours=1)
+    db.session.commit()
+    assert get_data_version() == version + 2
+    update_user(staff.id, "renamedreportstaff")
+    assert get_data_version() == version + 3
+    # a login only changes the user's token, which no cached response shows
+    login("renamedreportstaff", "staffpass")
+    assert get_data_version() == version + 3
+
+def test_data_version_bump_needs_no_second_connection(monkeypatch, caplog):
+    admin, staff = create_report_shifts(1)
+    shift_id = Shift.query.first().id
+    version = get_data_version()
+    db.session.commit()
+    # the bump waits for the writer to hand its connection back
+    checked_out, peak = [0], [0]
+    def checkout(dbapi_conn, record, proxy):
+        checked_out[0] += 1
+        peak[0] = max(peak[0], checked_out[0])
+    def checkin(dbapi_conn, record):
+        checked_out[0] -= 1
+    event.listen(db.engine, "checkout", checkout)
+    event.listen(db.engine, "checkin", checkin)
+    try:
+        clock_in(staff.id, shift_id)
+    finally:
+        event.remove(db.engine, "checkout", checkout)
+        event.remove(db.engine, "checkin", checkin)
+    assert peak[0] == 1
+    assert get_data_version() == version + 1
+
+    # the write has committed, so a failed bump is logged rather than raised
+    from sqlalchemy.exc import OperationalError
+    def fail(conn, name):
+        raise OperationalError("UPDATE data_version", {}, Exception("database is locked"))
+    monkeypatch.setattr("App.controllers.version._increment", fail)
+    with caplog.at_level(logging.ERROR, logger="App.controllers.version"):
+        clock_out(staff.id, shift_id)
+    assert db.session.get(Shift, shift_id).clock_out is not None
+    assert "Could not bump data version(s) shifts" in caplog.text
+    assert get_data_version() == version + 1
+
+def test_group_commit_batches_concurrent_clock_ins():
+    import threading
+    admin, staff = create_report_shifts(5)
+    staff_id = staff.id
+    shift_ids = [shift.id for shift in Shift.query.all()] + [999]
+    version = get_data_version()
+    app = current_app._get_current_object()
+    results = {}
+
+    def clock(shift_id):
+        with app.app_context():
+            try:
+                results[shift_id] = clock_in(staff_id, shift_id).clock_in
+            except ValueError as e:
+                results[shift_id] = e
+
+    clock_committer.window = 0.3
+    try:
+        threads = [threading.Thread(target=clock, args=(shift_id,)) for shift_id in shift_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        clock_committer.window = 0
+    # every caller got its own answer, and the writes shared one commit
+    assert isinstance(results.pop(999), ValueError)
+    assert all(isinstance(value, datetime) for value in results.values())
+    assert get_data_version() == version + 1
+    assert Shift.query.filter(Shift.clock_in.isnot(None)).count() == 5
+
+def test_pool_options_split_the_connection_limit():
+    assert pool_options("sqlite:///test.db", 4, 100, 90) == {}
+    # 90 connections over 4 workers: 22 each, 17 kept open and 5 overflow
+    options = pool_options("postgresql://db/roster", 4, 100, 90)
+    assert (options["pool_size"], options["max_overflow"]) == (17, 5)
+    assert options["pool_pre_ping"] and options["pool_recycle"]
+    # a worker never holds more connections than it has concurrent requests
+    options = pool_options("postgresql://db/roster", 1, 8, 90)
+    assert options["pool_size"] + options["max_overflow"] == 8
+    assert current_app.config["SQLALCHEMY_ENGINE_OPTIONS"] == {}
+
+def test_default_pools_fit_the_connection_limit(monkeypatch, tmp_path):
+    import importlib
+    from flask import Flask
+    from App.config import load_config
+    keys = ("WEB_CONCURRENCY", "WORKER_CONNECTIONS", "DB_MAX_CONNECTIONS")
+    environ = {k: v for k, v in os.environ.items() if k not in keys}
+    monkeypatch.setattr(os, "environ", dict(environ, FLASK_METRICS_DIR=str(tmp_path)))
+
+    def per_worker_connections():
+        app = Flask(__name__)
+        load_config(app, {})
+        options = pool_options("postgresql://db/roster", app.config["WEB_CONCURRENCY"],
+                               app.config["WORKER_CONNECTIONS"], app.config["DB_MAX_CONNECTIONS"])
+        return app.config, options["pool_size"] + options["max_overflow"]
+
+    # nothing set: the app assumes gunicorn's default worker count
+    config, per_worker = per_worker_connections()
+    assert 4 * per_worker <= config["DB_MAX_CONNECTIONS"] == 90
+    # under gunicorn, every worker it starts sizes its pool for that many workers
+    gunicorn_config = importlib.reload(importlib.import_module("gunicorn_config"))
+    config, per_worker = per_worker_connections()
+    assert config["WEB_CONCURRENCY"] == gunicorn_config.workers
+    assert gunicorn_config.workers * per_worker <= config["DB_MAX_CONNECTIONS"]
+
+def call_asgi(path, query="", headers=None):
+    from App.asgi import AsyncReadAPI
+    api = AsyncReadAPI(current_app._get_current_object())
+    messages = []
+
+    async def run():
+        scope = {
+            "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+            "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+        }
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+        async def send(message):
+            messages.append(message)
+        try:
+            await api(scope, receive, send)
+        finally:
+            await api.engine.dispose()
+
+    asyncio.run(run())
+    response_headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return messages[0]["status"], response_headers, body
+
+def test_async_read_api_matches_flask(empty_db):
+    pytest.importorskip("aiosqlite")
+    admin, staff = create_report_shifts(3)
+    for path, query, user in (("/staff/roster", "fields=id,start_time", staff),
+                              ("/shiftReport", "shape=columns", admin),
+                              ("/schedules", "", admin)):
+        flask_response = empty_db.get(f"{path}?{query}", headers=auth_headers(user))
+        status, headers, body = call_asgi(path, query, auth_headers(user))
+        assert status == 200
+        assert json.loads(body) == flask_response.get_json()
+        # both stacks hand out the same ETag, so either can answer the other's If-None-Match
+        assert headers["etag"] == flask_response.headers["ETag"]
+        assert call_asgi(path, query, dict(auth_headers(user), **{"If-None-Match": headers["etag"]}))[0] == 304
+
+    status, _, body = call_asgi("/shiftReport", "stream=1", auth_headers(admin))
+    assert status == 200 and json.loads(body) == get_shift_report(admin.id)
+
+    # keyset pages, following the cursor to the end
+    query = "limit=2"
+    while query:
+        flask_page = empty_db.get(f"/shiftReport?{query}", headers=auth_headers(admin)).get_json()
+        status, headers, body = call_asgi("/shiftReport", query, auth_headers(admin))
+        assert status == 200 and json.loads(body) == flask_page
+        query = flask_page["next"] and f"limit=2&after={flask_page['next']}"
+    assert len(flask_page["shifts"]) == 1
+    assert call_asgi("/shiftReport", "after=nonsense", auth_headers(admin))[0] == 403
+
+def test_async_read_api_auth_errors():
+    pytest.importorskip("aiosqlite")
+    admin, staff = create_report_shifts(1)
+    assert call_asgi("/shiftReport")[0] == 401
+    assert call_asgi("/shiftReport", headers={"Authorization": "Bearer not-a-token"})[0] == 401
+    assert call_asgi("/shiftReport", headers=auth_headers(staff))[0] == 403
+    assert call_asgi("/staff/roster", "fields=password", auth_headers(staff))[0] == 403
+    assert call_asgi("/createShift", headers=auth_headers(admin))[0] == 404
+
+# Wall time for a fresh interpreter to import the app and build the cli profile;
+# roughly 0.6s on a laptop, so this only trips on a real regression
+CLI_STARTUP_BUDGET_S = 2.0
+WEB_ONLY_MODULES = ["flask_admin", "flask_cors", "flask_uploads", "alembic", "App.views", "pytest"]
+
+def test_cli_profile_startup_budget():
+    script = (
+        "import json, sys, time\n"
+        "began = time.perf_counter()\n"
+        "from App.main import create_app\n"
+        "create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}, profile='cli')\n"
+        "elapsed = time.perf_counter() - began\n"
+        f"print(json.dumps([elapsed, [m for m in {WEB_ONLY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__)))).stdout
+    elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+    assert loaded == []
+    assert elapsed < CLI_STARTUP_BUDGET_S
+
+def test_async_entry_point_skips_web_modules():
+    pytest.importorskip("aiosqlite")
+    script = f"import json, sys, asgi\nprint(json.dumps([m for m in {WEB_ONLY_MODULES!r} if m in sys.modules]))\n"
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                            env=dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI="sqlite://")).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
+
+def test_batch_runner_runs_commands_in_process():
+    import click
+    from flask.cli import AppGroup
+    from App.batch import BatchRunner, parse_batch_line
+
+    assert parse_batch_line('shift schedule 2 1 "2025-10-01 09:00:00"') == ["shift", "schedule", "2", "1", "2025-10-01 09:00:00"]
+    assert parse_batch_line('{"args": ["shift", "clockin", 12]}') == ["shift", "clockin", "12"]
+    assert parse_batch_line('{"command": "shift roster --all"}') == ["shift", "roster", "--all"]
+    assert parse_batch_line("  # comment") is None
+    for bad in ('{"args": "shift roster"}', '{"command": ["shift", "roster"]}', '{"cmd": "shift roster"}',
+                '{"command": 12}', '{"command": "shift roster', 'shift schedule "unclosed'):
+        with pytest.raises(ValueError):
+            parse_batch_line(bad)
+
+    cli = AppGroup("flask")
+    group = AppGroup("user")
+    @group.command("create")
+    @click.argument("username")
+    def create(username):
+        print(create_user(username, "pass", "staff").id)
+    @group.command("fail")
+    def fail():
+        create_user("dupe", "pass", "staff")
+        create_user("dupe", "pass", "staff")
+    cli.add_command(group)
+
+    runner = BatchRunner(cli, current_app._get_current_object(), exclude={"nested"})
+    first = runner.run(["user", "create", "batchuser"])
+    assert first["ok"] and first["output"].strip().isdigit()
+    assert not runner.run(["user", "fail"])["ok"]
+    # the failed command's rollback leaves the shared session usable
+    assert runner.run(["user", "create", "afterfail"])["ok"]
+    assert runner.run(["user", "nope"])["error"] == "No such command 'nope'."
+    assert not runner.run(["nested"])["ok"]
+
+    summary = runner.summary()
+    assert summary["commands"] == 5 and summary["failed"] == 3
+    assert summary["by_command"]["user create"]["count"] == 2
+
+def test_metrics_and_profile_header(empty_db):
+    admin, staff = create_report_shifts(3)
+    metrics.reset()
+    response = empty_db.get("/shiftReport?shape=columns", headers=dict(auth_headers(admin), **{"X-Profile": "1"}))
+    profile = json.loads(response.headers["X-Profile"])
+    # identity lookup, data version and the report itself
+    assert profile["queries"] >= 3 and profile["sql_ms"] > 0
+    assert profile["serialization_ms"] > 0 and profile["total_ms"] >= profile["sql_ms"]
+    assert "X-Profile" not in empty_db.get("/health").headers
+    assert "X-Profile" not in empty_db.get("/health", headers={"X-Profile": "0"}).headers
+    # the breakdown goes to the same callers as /metrics, or anyone in debug mode
+    assert "X-Profile" not in empty_db.get("/health", headers={"X-Profile": "1"}).headers
+    assert "X-Profile" not in empty_db.get("/staff/roster", headers=dict(auth_headers(staff), **{"X-Profile": "1"})).headers
+    current_app.debug = True
+    try:
+        assert "X-Profile" in empty_db.get("/health", headers={"X-Profile": "1"}).headers
+    finally:
+        current_app.debug = False
+
+    # admins only, unless METRICS_PUBLIC
+    assert empty_db.get("/metrics").status_code == 403
+    assert empty_db.get("/metrics", headers=auth_headers(staff)).status_code == 403
+    body = empty_db.get("/metrics", headers=auth_headers(admin)).get_data(as_text=True)
+    assert 'http_requests_total{endpoint="/shiftReport",method="GET",status="200"} 1' in body
+    assert 'http_requests_total{endpoint="/health",method="GET",status="200"} 4' in body
+    assert 'http_request_duration_seconds_bucket{endpoint="/shiftReport",method="GET",le="+Inf"} 1' in body
+    assert f'http_request_sql_queries_sum{{endpoint="/shiftReport"}} {profile["queries"]}' in body
+    assert "# TYPE http_request_serialization_seconds histogram" in body
+    current_app.config["METRICS_PUBLIC"] = True
+    try:
+        assert empty_db.get("/metrics").status_code == 200
+    finally:
+        current_app.config.pop("METRICS_PUBLIC")
+
+def test_metrics_add_up_every_worker(empty_db, tmp_path, monkeypatch):
+    from App.metrics import Metrics
+    metrics.reset()
+    monkeypatch.setattr(metrics, "directory", str(tmp_path))
+    monkeypatch.setattr(metrics, "flush_interval", 60)
+    monkeypatch.setattr(metrics, "_flushed_at", 0.0)
+    for _ in range(3):
+        empty_db.get("/health")
+    # written after the first request only, not on every one
+    with open(tmp_path / f"metrics-{os.getpid()}.json") as f:
+        assert json.load(f)["requests"] == [[["/health", "GET", 200], 1]]
+    # another worker process, writing its own file to the same directory
+    other = Metrics()
+    other.directory = str(tmp_path)
+    other.series["requests"].inc(("/health", "GET", 200), 4)
+    other.series["latency"].observe(("/health", "GET"), 0.002)
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "getpid", lambda: -1)
+        other.flush()
+    assert sorted(os.listdir(tmp_path)) == ["metrics--1.json", f"metrics-{os.getpid()}.json"]
+
+    current_app.config["METRICS_PUBLIC"] = True
+    try:
+        body = empty_db.get("/metrics").get_data(as_text=True)
+    finally:
+        current_app.config.pop("METRICS_PUBLIC")
+    # the scraping worker writes its own file first
+    assert 'http_requests_total{endpoint="/health",method="GET",status="200"} 7' in body
+    assert 'http_request_duration_seconds_count{endpoint="/health",method="GET"} 4' in body
+
+# Budgets don't grow with the number of rows, so a per-row lazy load fails them
+def test_read_paths_stay_within_query_budget(empty_db, query_budget):
+    admin, staff = create_report_shifts(6)
+    admin_id, staff_id = admin.id, staff.id
+    db.session.remove()
+    # identity lookup plus one query
+    with query_budget(2):
+        assert len(get_shift_report(admin_id)) == 6
+    with query_budget(2):
+        assert len(get_combined_roster(staff_id)) == 6
+    # schedules, then their shifts with staff in one selectin query
+    with query_budget(2):
+        assert [len(s.get_json()["shifts"]) for s in Schedule.query_with_shifts().all()] == [6]
+    db.session.remove()
+    with pytest.raises(QueryBudgetExceeded) as exceeded:
+        with query_budget(2):
+            [s.get_json() for s in Schedule.query.all()]
+    assert "budget is 2" in str(exceeded.value)
+
+    # identity, data version and the read itself
+    for path, user_id in (("/shiftReport", admin_id), ("/staff/roster", staff_id), ("/schedules", admin_id)):
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+        with query_budget(3):
+            assert empty_db.get(path, headers=headers).status_code == 200
+
+def test_query_budget_decorator_counts_each_call():
+    create_user("budgeted", "pass", "staff")
+    @QueryBudget(1, db.engine)
+    def lookup(username):
+        return User.query.filter_by(username=username).first()
+    assert lookup("budgeted").username == "budgeted"
+    assert lookup("budgeted").username == "budgeted"
+
+    @QueryBudget(1, db.engine)
+    def lookup_twice(username):
+        return lookup(username), lookup(username)
+    with pytest.raises(QueryBudgetExceeded):
+        lookup_twice("budgeted")
+
+def test_repeated_query_shape_is_logged(caplog):
+    assert query_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x'") == \
+        query_shape("SELECT *\n FROM t WHERE id IN (?) AND name = 'y'")
+    admin = create_user("repeatadmin", "adminpass", "admin")
+    schedule = Schedule(name="Repeat", created_by=admin.id)
+    db.session.add(schedule)
+    db.session.commit()
+    add_staff_shifts(admin, schedule, 4, "repeat")
+    db.session.remove()
+
+    current_app.config["QUERY_REPEAT_THRESHOLD"] = 2
+    try:
+        with current_app.test_request_context("/roster"), caplog.at_level(logging.WARNING, "App.querybudget"):
+            current_app.preprocess_request()
+            # staff lazy loaded once per shift
+            [shift.get_json() for shift in Shift.query.all()]
+    finally:
+        current_app.config["QUERY_REPEAT_THRESHOLD"] = 0
+    warnings = [r.getMessage() for r in caplog.records if r.name == "App.querybudget"]
+    assert len(warnings) == 1
+    assert "3 times in GET /roster" in warnings[0] and "App/models/shift.py" in warnings[0]
+
+def test_on_shift_lookup_reads_one_hour_bucket(empty_db, query_budget):
+    admin = create_user("bucketadmin", "adminpass", "admin")
+    night = create_user("night", "staffpass", "staff")
+    day = create_user("day", "staffpass", "staff")
+    outsider = create_user("visitor", "pass", "user")
+    schedule = Schedule(name="Buckets", created_by=admin.id)
+    db.session.add(schedule)
+    db.session.commit()
+    overnight = schedule_shift(admin.id, night.id, schedule.id, datetime(2025, 11, 1, 22, 30), datetime(2025, 11, 2, 6, 0))
+    result = schedule_shifts(admin.id, [
+        {"staff_id": day.id, "schedule_id": schedule.id, "start_time": "2025-11-02T05:45:00", "end_time": "2025-11-02T14:00:00"},
+        {"staff_id": night.id, "schedule_id": schedule.id, "start_time": "2025-11-02T22:00:00", "end_time": "2025-11-03T06:00:00"}
+    ])
+    early_id = result["created"][0]
+    # 22:00 to 05:00 is eight hours; 05:00 to 13:00 is nine
+    assert ShiftBucket.query.filter_by(shift_id=overnight.id).count() == 8
+    assert ShiftBucket.query.filter_by(shift_id=early_id).count() == 9
+
+    def on_shift(at):
+        return [s["id"] for s in get_on_shift(admin.id, at)]
+    assert on_shift(datetime(2025, 11, 1, 22, 29)) == []
+    assert on_shift(datetime(2025, 11, 1, 22, 30)) == [overnight.id]
+    assert on_shift(datetime(2025, 11, 2, 5, 50)) == sorted([overnight.id, early_id])
+    # end is exclusive
+    assert on_shift(datetime(2025, 11, 2, 6, 0)) == [early_id]
+    assert [s["staff_name"] for s in get_on_shift(night.id, datetime(2025, 11, 3, 1, 0))] == ["night"]
+    with pytest.raises(PermissionError):
+        get_on_shift(outsider.id, datetime(2025, 11, 2, 1, 0))
+
+    admin_id, day_id = admin.id, day.id
+    with query_budget(2):
+        assert json.loads(get_on_shift_json(admin_id, datetime(2025, 11, 2, 12, 0), fields="id,staff_id", shape="columns")) == \
+            {"id": [early_id], "staff_id": [day_id]}
+    response = empty_db.get("/roster/at?time=2025-11-02T01:00:00&fields=staff_name", headers=auth_headers(night))
+    assert response.status_code == 200 and response.get_json() == [{"staff_name": "night"}]
+    assert empty_db.get("/roster/at?time=soon", headers=auth_headers(night)).status_code == 403
+
+    # reindex rebuilds the buckets from the shift table
+    db.session.execute(db.delete(ShiftBucket))
+    db.session.commit()
+    assert on_shift(datetime(2025, 11, 2, 1, 0)) == []
+    with pytest.raises(PermissionError):
+        reindex_shifts(day_id)
+    assert reindex_shifts(admin_id, batch_size=1) == {"shifts": 3, "buckets": 25}
+    assert on_shift(datetime(2025, 11, 2, 1, 0)) == [overnight.id]
+
+def test_coverage_sweep_matches_per_slot_loop():
+    import random
+    import numpy as np
+    from App.coverage import headcounts, demand_curve, shortfalls, parse_demand
+    rng = random.Random(7)
+    origin, slot, slots = 1_700_006_400, 900, 96 * 3
+    intervals = []
+    for _ in range(300):
+        start = origin + rng.randrange(-86400, slots * slot)
+        intervals.append((start, start + rng.randrange(60, 12 * 3600)))
+    starts = np.array([i[0] for i in intervals], dtype=np.int64)
+    ends = np.array([i[1] for i in intervals], dtype=np.int64)
+    expected = [sum(1 for s, e in intervals if s <= origin + i * slot and e >= origin + (i + 1) * slot)
+                for i in range(slots)]
+    assert headcounts(starts, ends, origin, slots, slot).tolist() == expected
+
+    demand = parse_demand("06:00=2, 22:00=1")
+    assert demand == parse_demand({"06:00": 2, "22:00": "1"}) == parse_demand('{"22:00": 1, "06:00": 2}')
+    required = demand_curve(demand, 96 * 2, slot)
+    # wraps past midnight: before 06:00 the 22:00 value applies
+    assert required[0] == 1 and required[24] == 2 and required[88] == 1 and required[96 + 23] == 1
+    assert shortfalls(np.array([0, 2, 1, 1, 3]), np.array([1, 1, 2, 3, 3])) == [(0, 1, 1, 0), (2, 4, 2, 1)]
+    for bad in ("08:00", "25:00=1", "08:00=-1", "x=1"):
+        with pytest.raises(ValueError):
+            parse_demand(bad)
+
+def test_schedule_coverage_endpoint(empty_db):
+    admin = create_user("coverageadmin", "adminpass", "admin")
+    first = create_user("cover1", "staffpass", "staff")
+    second = create_user("cover2", "staffpass", "staff")
+    schedule = Schedule(name="Coverage", created_by=admin.id)
+    db.session.add(schedule)
+    db.session.commit()
+    schedule_shift(admin.id, first.id, schedule.id, datetime(2025, 11, 3, 8, 0), datetime(2025, 11, 3, 16, 0))
+    # covers 12:15 onwards only, slots are counted when fully covered
+    schedule_shift(admin.id, second.id, schedule.id, datetime(2025, 11, 3, 12, 10), datetime(2025, 11, 3, 20, 0))
+
+    coverage = get_schedule_coverage(admin.id, schedule.id, demand="08:00=2,18:00=1,22:00=0")
+    assert (coverage["start"], coverage["end"]) == ("2025-11-03T00:00:00", "2025-11-04T00:00:00")
+    assert len(coverage["headcount"]) == len(coverage["required"]) == 96
+    assert coverage["headcount"][32] == 1 and coverage["headcount"][48] == 1 and coverage["headcount"][49] == 2
+    assert coverage["peak_headcount"] == 2
+    assert [(r["start"][11:16], r["end"][11:16], r["min_rostered"]) for r in coverage["shortfalls"]] == [
+        ("08:00", "12:15", 1), ("16:00", "18:00", 1), ("20:00", "22:00", 0)
+    ]
+    assert coverage["understaffed_slots"] == 33 and coverage["staff_hours_short"] == 8.25
+
+    current_app.config["COVERAGE_DEMAND"] = {"00:00": 1}
+    try:
+        response = empty_db.get(f"/schedules/{schedule.id}/coverage?from=2025-11-02&to=2025-11-04",
+                                headers=auth_headers(admin))
+    finally:
+        current_app.config.pop("COVERAGE_DEMAND")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["demand"] == {"00:00": 1} and len(body["headcount"]) == 192
+    assert body["shortfalls"][0] == {"start": "2025-11-02T00:00:00", "end": "2025-11-03T08:00:00",
+                                     "max_short": 1, "min_rostered": 0}
+    assert empty_db.get("/schedules/999/coverage", headers=auth_headers(admin)).status_code == 403
+    assert empty_db.get(f"/schedules/{schedule.id}/coverage", headers=auth_headers(first)).status_code == 403
+
+def check_solution(problem, result):
+    import numpy as np
+    p = problem
+    headcount = np.zeros(len(p.required), dtype=np.int64)
+    by_staff = {}
+    for staff, start in result["shifts"]:
+        assert start % p.start_every == 0 and start + p.shift_slots <= len(p.required)
+        headcount[start:start + p.shift_slots] += 1
+        by_staff.setdefault(staff, []).append((start, start + p.shift_slots))
+    for staff, busy in by_staff.items():
+        weeks = {}
+        for first, end in busy + [r for r in p.fixed.get(staff, ()) if 0 <= r[0] < len(p.required)]:
+            weeks[first // p.week_slots] = weeks.get(first // p.week_slots, 0) + end - first
+        assert max(weeks.values()) <= p.max_week_slots
+        # no overlaps, and the minimum rest between any two of their shifts
+        busy = sorted(busy + p.fixed.get(staff, []))
+        assert all(second[0] - first[1] >= p.rest_slots for first, second in zip(busy, busy[1:]))
+    assert result["shortfall_slots"] == int(np.maximum(p.required - headcount, 0).sum())
+    assert result["rostered_slots"] == int(headcount.sum())
+    return headcount
+
+def test_solver_respects_rest_weekly_hours_and_fixed_shifts():
+    import numpy as np
+    from App.coverage import demand_curve, parse_demand
+    from App.solver import SchedulingProblem, solve, solve_restarts
+    # 2 weeks of 1 hour slots: 8 hour shifts, 11 hours rest, 40 hours a week
+    required = demand_curve(parse_demand("00:00=1,08:00=3,16:00=2"), 14 * 24, 3600)
+    fixed = {0: [(30, 38)], 3: [(-5, 3)]}
+    problem = SchedulingProblem(required, 12, 8, 11, 40, 7 * 24, start_every=1, fixed=fixed)
+    result = solve(problem, seed=1, time_budget=2)
+    headcount = check_solution(problem, result)
+    # plenty of staff for the demand, and it tiles exactly without waste
+    assert result["shortfall_slots"] == 0
+    assert (headcount == required).all()
+
+    # too few staff: every hour they can give is used and the rest is short
+    short = SchedulingProblem(required, 3, 8, 11, 40, 7 * 24, start_every=4)
+    result = solve_restarts(short, restarts=3, time_budget=1.5)
+    headcount = check_solution(short, result)
+    assert result["rostered_slots"] == 3 * 2 * 40 and (headcount <= required).all()
+    assert result["seed"] in range(3)
+    assert solve_restarts(short, restarts=1, time_budget=0)["shifts"] == []
+    # shifts longer than the window have nowhere to start
+    assert solve(SchedulingProblem(required[:24], 3, 25, 11, 40, 7 * 24), time_budget=1)["shifts"] == []
+
+def test_generate_schedule_in_one_transaction(empty_db, query_budget):
+    admin = create_user("genadmin", "adminpass", "admin")
+    staff = [create_user(f"gen{i}", "staffpass", "staff") for i in range(8)]
+    other = Schedule(name="Existing", created_by=admin.id)
+    db.session.add(other)
+    db.session.commit()
+    schedule_shift(admin.id, staff[0].id, other.id, datetime(2025, 11, 3, 6, 0), datetime(2025, 11, 3, 14, 0))
+    staff_ids = [s.id for s in staff]
+
+    with query_budget(9) as budget:
+        summary = generate_schedule(admin.id, "Generated", datetime(2025, 11, 3, 9, 30), days=7,
+                                    demand="06:00=2,22:00=1", staff_ids=staff_ids, time_budget=2)
+    assert sum(s.lstrip().startswith("INSERT INTO shift ") for s in budget.statements) == 1
+    assert sum(s.lstrip().startswith("INSERT INTO shift_bucket") for s in budget.statements) == 1
+    assert (summary["start"], summary["end"]) == ("2025-11-03T00:00:00", "2025-11-10T00:00:00")
+    assert summary["shortfall_hours"] == 0 and summary["demand_hours"] == 7 * (16 * 2 + 8)
+    assert summary["rostered_hours"] == summary["shifts"] * 8
+
+    coverage = get_schedule_coverage(admin.id, summary["schedule_id"], demand="06:00=2,22:00=1")
+    assert coverage["understaffed_slots"] == 0 and coverage["shifts"] == summary["shifts"]
+    # the existing shift and the 11 hours of rest around it stay free
+    generated = Shift.query.filter_by(schedule_id=summary["schedule_id"], staff_id=staff[0].id).all()
+    assert all(s.end_time <= datetime(2025, 11, 2, 19, 0) or s.start_time >= datetime(2025, 11, 4, 1, 0)
+               for s in generated)
+    assert ShiftBucket.query.filter(ShiftBucket.shift_id.in_([s.id for s in generated])).count() == 8 * len(generated)
+
+    with pytest.raises(PermissionError):
+        generate_schedule(staff[0].id, "Nope", datetime(2025, 11, 3), demand="00:00=1")
+    for bad in ({"demand": ""}, {"demand": "00:00=1", "shift_hours": 7.9},
+                {"demand": "00:00=1", "days": 0}, {"demand": "00:00=1", "staff_ids": [admin.id]},
+                {"demand": "00:00=1", "days": 1, "shift_hours": 25}, {"demand": "00:00=1", "time_budget": 0},
+                {"demand": "00:00=1", "time_budget": -1}, {"demand": "00:00=1", "time_budget": float("nan")}):
+        with pytest.raises(ValueError):
+            generate_schedule(admin.id, "Bad", datetime(2025, 11, 3), **bad)
+    assert Schedule.query.filter_by(name="Bad").count() == 0
+
+def test_generate_schedule_endpoint(empty_db):
+    admin = create_user("genapiadmin", "adminpass", "admin")
+    staff = [create_user(f"genapi{i}", "staffpass", "staff") for i in range(4)]
+    body = {"name": "API generated", "start": "2025-11-10", "days": 2, "demand": {"08:00": 1, "20:00": 0},
+            "staff": [s.id for s in staff], "shift_hours": 6, "start_every": 120, "time_budget": 60}
+    current_app.config["SCHEDULE_SOLVER_SECONDS"] = 1
+    try:
+        response = empty_db.post("/schedules/generate", json=body, headers=auth_headers(admin))
+    finally:
+        current_app.config.pop("SCHEDULE_SOLVER_SECONDS")
+    assert response.status_code == 201
+    summary = response.get_json()
+    assert summary["shifts"] == 4 and summary["shortfall_hours"] == 0 and summary["solve_ms"] < 2000
+    times = sorted((s.start_time.hour, s.end_time.hour)
+                   for s in Shift.query.filter_by(schedule_id=summary["schedule_id"]))
+    assert times == [(8, 14), (8, 14), (14, 20), (14, 20)]
+
+    assert empty_db.post("/schedules/generate", json=body, headers=auth_headers(staff[0])).status_code == 403
+    assert empty_db.post("/schedules/generate", json=dict(body, demand="9am"),
+                         headers=auth_headers(admin)).status_code == 403
+    assert empty_db.post("/schedules/generate", json=[body], headers=auth_headers(admin)).status_code == 400
+    assert empty_db.post("/schedules/generate", json=dict(body, name="Negative", time_budget=-1),
+                         headers=auth_headers(admin)).status_code == 403
+    assert Schedule.query.filter_by(name="Negative").count() == 0
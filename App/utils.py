@@ -0,0 +1,23 @@
+import zlib
+from datetime import datetime
+
+# Accepts ISO 8601 first, then falls back to "YYYY-MM-DD HH:MM:SS"
+def parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid date/time: {value}")
+
+# Gzips a stream of text chunks on the fly (wbits=31 writes the gzip header and trailer)
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,9 +1,12 @@
 # app/views/staff_views.py
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context, current_app
 from datetime import datetime
-from App.controllers import staff, auth, admin
+from App.controllers import staff, auth, admin, export, report, generate
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
+from App.utils import parse_datetime, gzip_chunks
+from App.serializers import dumps
+from .caching import etag_on_data_version
 
 admin_view = Blueprint('admin_view', __name__, template_folder='../templates')
 
@@ -21,6 +24,13 @@ admin_view = Blueprint('admin_view', __name__, template_folder='../templates')
 # 1. Create Schedule
 # 2. Get Schedule Report
 
+# Writes a JSON array one row at a time so the whole report is never held in memory
+def stream_json_array(rows):
+    yield "["
+    for i, row in enumerate(rows):
+        yield ("," if i else "") + dumps(row)
+    yield "]"
+
 @admin_view.route('/createSchedule', methods=['POST'])
 @jwt_required()
 def createSchedule():
@@ -36,6 +46,30 @@ def createSchedule():
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
 
+@admin_view.route('/schedules', methods=['GET'])
+@jwt_required()
+@etag_on_data_version
+def listSchedules():
+    try:
+        admin_id = get_jwt_identity()
+        # optional ?fields=id,name and ?shape=columns
+        schedules = admin.get_schedule_summaries_json(
+            admin_id, fields=request.args.get("fields"), shape=request.args.get("shape", "records"))
+        return Response(schedules, mimetype="application/json"), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/cache/stats', methods=['GET'])
+@jwt_required()
+def cacheStats():
+    try:
+        admin_id = get_jwt_identity()
+        return jsonify(admin.get_cache_stats(admin_id)), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+
 @admin_view.route('/createShift', methods=['POST'])
 @jwt_required()
 def createShift():
@@ -47,31 +81,175 @@ def createShift():
         startTime = data.get("start_time") # gets the startTime from the request body
         endTime = data.get("end_time") # gets the endTime from the request body
 
-    # Try ISO first, fallback to "YYYY-MM-DD HH:MM:SS"
-        try:
-            start_time = datetime.fromisoformat(startTime)
-            end_time = datetime.fromisoformat(endTime)
-        except ValueError:
-            start_time = datetime.strptime(startTime, "%Y-%m-%d %H:%M:%S")
-            end_time = datetime.strptime(endTime, "%Y-%m-%d %H:%M:%S")
+        # Try ISO first, fallback to "YYYY-MM-DD HH:MM:SS"
+        start_time = parse_datetime(startTime)
+        end_time = parse_datetime(endTime)
 
         shift = admin.schedule_shift(admin_id, staffID, scheduleID, start_time, end_time)  # Call controller method
-        print("Debug: Created shift in view:", shift.get_json())
-        
         return jsonify(shift.get_json()), 200 # Return the created shift as JSON
     except (PermissionError, ValueError) as e:
         return jsonify({"error": str(e)}), 403
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
 
+# Body is a list of shifts (or {"shifts": [...]}) using the same fields as /createShift
+@admin_view.route('/createShifts', methods=['POST'])
+@jwt_required()
+def createShifts():
+    try:
+        admin_id = get_jwt_identity()
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get("shifts")
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            return jsonify({"error": "Expected a list of shifts"}), 400
+        rows = [{
+            "staff_id": item.get("staffID"),
+            "schedule_id": item.get("scheduleID"),
+            "start_time": item.get("start_time"),
+            "end_time": item.get("end_time")
+        } for item in data]
+        result = admin.schedule_shifts(admin_id, rows)  # Call controller method
+        return jsonify(result), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
 @admin_view.route('/shiftReport', methods=['GET'])
 @jwt_required()
+@etag_on_data_version
 def shiftReport():
     try:
         admin_id = get_jwt_identity()
-        report = admin.get_shift_report(admin_id)  # Call controller method
-        return jsonify(report), 200
+        if request.args.get("stream"):
+            rows = admin.stream_shift_report(admin_id)
+            return Response(stream_with_context(stream_json_array(rows)), mimetype="application/json"), 200
+        if "limit" in request.args or "after" in request.args:
+            # keyset pagination: pass the returned "next" cursor back as ?after=
+            page = admin.get_shift_report_page(admin_id, request.args.get("limit", type=int), request.args.get("after"))
+            return jsonify(page), 200
+        # optional ?fields=id,start_time and ?shape=columns
+        report = admin.get_shift_report_json(
+            admin_id, fields=request.args.get("fields"), shape=request.args.get("shape", "records"))
+        return Response(report, mimetype="application/json"), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/export/shifts', methods=['GET'])
+@jwt_required()
+def exportShifts():
+    try:
+        admin_id = get_jwt_identity()
+        # ?format=csv|ndjson with optional from, to, schedule_id, staff_id and fields filters
+        fmt = request.args.get("format", "csv")
+        start = request.args.get("from")
+        end = request.args.get("to")
+        chunks = export.export_shifts(
+            admin_id,
+            fmt,
+            start=parse_datetime(start) if start else None,
+            end=parse_datetime(end) if end else None,
+            schedule_id=request.args.get("schedule_id", type=int),
+            staff_id=request.args.get("staff_id", type=int),
+            fields=request.args.get("fields")
+        )
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f"attachment; filename=shifts.{fmt}"}
+    if "gzip" in request.accept_encodings:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers), 200
+
+# Staff rostered per slot against the demand curve, with the understaffed runs.
+# Optional ?from=&to= (whole days) and ?demand=08:00=3,17:00=2 to override COVERAGE_DEMAND
+@admin_view.route('/schedules/<int:schedule_id>/coverage', methods=['GET'])
+@jwt_required()
+@etag_on_data_version
+def scheduleCoverage(schedule_id):
+    try:
+        admin_id = get_jwt_identity()
+        start = request.args.get("from")
+        end = request.args.get("to")
+        coverage = report.get_schedule_coverage(
+            admin_id,
+            schedule_id,
+            start=parse_datetime(start) if start else None,
+            end=parse_datetime(end) if end else None,
+            demand=request.args.get("demand")
+        )
+        return jsonify(coverage), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+# Fills a new schedule from a demand curve. Body: {"name", "start", "demand"}
+# plus optional days, staff (ids), shift_hours, max_hours, min_rest,
+# start_every (minutes), time_budget, restarts and processes. The solver runs
+# in the request, so time_budget and processes are capped by
+# SCHEDULE_SOLVER_SECONDS and SCHEDULE_SOLVER_PROCESSES.
+@admin_view.route('/schedules/generate', methods=['POST'])
+@jwt_required()
+def generateSchedule():
+    try:
+        admin_id = get_jwt_identity()
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        start = data.get("start")
+        staff_ids = data.get("staff")
+        if staff_ids is not None and not isinstance(staff_ids, list):
+            raise ValueError("staff must be a list of ids")
+        budget = current_app.config.get("SCHEDULE_SOLVER_SECONDS", 5)
+        summary = generate.generate_schedule(
+            admin_id,
+            data.get("name"),
+            parse_datetime(start) if start else datetime.utcnow(),
+            days=int(data.get("days", 28)),
+            demand=data.get("demand"),
+            staff_ids=[int(staff_id) for staff_id in staff_ids] if staff_ids is not None else None,
+            shift_hours=float(data.get("shift_hours", 8)),
+            max_hours=float(data.get("max_hours", 40)),
+            min_rest=float(data.get("min_rest", 11)),
+            start_every=int(data.get("start_every", 60)),
+            time_budget=min(float(data.get("time_budget", budget)), budget),
+            restarts=int(data.get("restarts", 1)),
+            processes=min(int(data.get("processes", 1)), current_app.config.get("SCHEDULE_SOLVER_PROCESSES", 1))
+        )
+        return jsonify(summary), 201
     except (PermissionError, ValueError) as e:
         return jsonify({"error": str(e)}), 403
     except SQLAlchemyError:
-        return jsonify({"error": "Database error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Database error"}), 500
+
+@admin_view.route('/reports/hours', methods=['GET'])
+@jwt_required()
+@etag_on_data_version
+def hoursReport():
+    try:
+        admin_id = get_jwt_identity()
+        # ?group=day|week with optional from, to, staff_id and grace (minutes) filters
+        start = request.args.get("from")
+        end = request.args.get("to")
+        hours = report.get_hours_report(
+            admin_id,
+            request.args.get("group", "day"),
+            start=parse_datetime(start) if start else None,
+            end=parse_datetime(end) if end else None,
+            staff_id=request.args.get("staff_id", type=int),
+            grace=request.args.get("grace", 0, type=int)
+        )
+        return jsonify(hours), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
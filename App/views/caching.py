@@ -0,0 +1,26 @@
+from functools import wraps
+from flask import request, make_response, current_app
+from flask_jwt_extended import get_jwt_identity
+
+from App.controllers.version import get_data_version, data_version_etag
+
+# Conditional GET for views whose output only changes when shift data is written.
+# The ETag is derived from the data version, the caller and the full URL, so a
+# matching If-None-Match gets a 304 after one tiny version lookup and the view
+# (and its shift query) never runs. Must be applied under @jwt_required().
+def etag_on_data_version(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # the version is read before the view runs: a write landing in between
+        # only makes the next poll fetch again, it never pins stale data
+        etag = data_version_etag(get_data_version(), get_jwt_identity(), request.full_path)
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
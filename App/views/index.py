@@ -1,5 +1,6 @@
-from flask import Blueprint, redirect, render_template, request, send_from_directory, jsonify
-from App.controllers import create_user, initialize
+from flask import Blueprint, redirect, render_template, request, send_from_directory, jsonify, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from App.controllers import create_user, initialize, render_metrics
 
 index_views = Blueprint('index_views', __name__, template_folder='../templates')
 
@@ -14,4 +15,13 @@ def init():
 
 @index_views.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status':'healthy'})
\ No newline at end of file
+    return jsonify({'status':'healthy'})
+
+# Prometheus text format, for every worker when METRICS_DIR is shared
+@index_views.route('/metrics', methods=['GET'])
+@jwt_required(optional=True)
+def metrics_page():
+    try:
+        return Response(render_metrics(get_jwt_identity()), mimetype="text/plain; version=0.0.4")
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
\ No newline at end of file
@@ -1,6 +1,8 @@
 # app/views/staff_views.py
-from flask import Blueprint, jsonify, request
-from App.controllers import staff, auth
+from flask import Blueprint, jsonify, request, Response
+from App.controllers import staff, auth, onshift
+from App.utils import parse_datetime
+from .caching import etag_on_data_version
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -17,12 +19,46 @@ staff_views = Blueprint('staff_views', __name__, template_folder='../templates')
 # Staff view roster route
 @staff_views.route('/staff/roster', methods=['GET'])
 @jwt_required()
+@etag_on_data_version
 def view_roster():
     try:
         staff_id = get_jwt_identity()  # get the user id stored in JWT
         # staffData = staff.get_user(staff_id).get_json()  # Fetch staff data
-        roster = staff.get_combined_roster(staff_id)  # staff.get_combined_roster should return the json data of the roseter
-        return jsonify(roster), 200
+        # optional filters: ?staff_id=<id>&from=<datetime>&to=<datetime>
+        # and output options: ?fields=id,start_time&shape=columns
+        for_staff_id = request.args.get("staff_id", type=int)
+        start = request.args.get("from")
+        end = request.args.get("to")
+        roster = staff.get_combined_roster_json(
+            staff_id,
+            for_staff_id=for_staff_id,
+            start=parse_datetime(start) if start else None,
+            end=parse_datetime(end) if end else None,
+            fields=request.args.get("fields"),
+            shape=request.args.get("shape", "records")
+        )  # already serialized, possibly straight from the response cache
+        return Response(roster, mimetype="application/json"), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
+    except SQLAlchemyError:
+        return jsonify({"error": "Database error"}), 500
+
+# Who is on shift at ?time=<datetime> (default now), for admins, staff and
+# integrations such as door access; same ?fields= and ?shape= as the roster
+@staff_views.route('/roster/at', methods=['GET'])
+@jwt_required()
+def view_on_shift():
+    try:
+        at = request.args.get("time")
+        on_shift = onshift.get_on_shift_json(
+            get_jwt_identity(),
+            at=parse_datetime(at) if at else None,
+            fields=request.args.get("fields"),
+            shape=request.args.get("shape", "records")
+        )
+        return Response(on_shift, mimetype="application/json"), 200
+    except (PermissionError, ValueError) as e:
+        return jsonify({"error": str(e)}), 403
     except SQLAlchemyError:
         return jsonify({"error": "Database error"}), 500
 
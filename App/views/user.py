@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for
+from flask import Blueprint, render_template, jsonify, request, send_from_directory, flash, redirect, url_for, Response
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
 
 from.index import index_views
@@ -7,6 +7,7 @@ from App.controllers import (
     create_user,
     get_all_users,
     get_all_users_json,
+    encode_all_users,
     jwt_required
 )
 
@@ -26,8 +27,11 @@ def create_user_action():
 
 @user_views.route('/api/users', methods=['GET'])
 def get_users_action():
-    users = get_all_users_json()
-    return jsonify(users)
+    try:
+        users = encode_all_users(request.args.get("fields"), request.args.get("shape", "records"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(users, mimetype="application/json")
 
 @user_views.route('/api/users', methods=['POST'])
 def create_user_endpoint():
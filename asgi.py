@@ -0,0 +1,9 @@
+# Entry point for the async read API (see App/asgi.py), served next to the
+# gunicorn/Flask app, e.g.
+#
+#   uvicorn asgi:app --port 8081
+from App.main import create_app
+from App.asgi import create_asgi_app
+
+# it only needs the config, database and JWT settings, not the web-only extensions
+app = create_asgi_app(create_app(profile="cli"))
@@ -0,0 +1,134 @@
+# Roster reads through the gevent/Flask stack and the async read API (App/asgi.py)
+# at the same concurrency. Each stack runs in its own process (gevent has to
+# patch before anything else is imported) against one seeded database, and
+# reports latency, throughput and how much the process grew while holding
+# --concurrency requests in flight.
+#
+#   python -m benchmarks.asgi --shifts 50000 --concurrency 200 --requests 2000
+import sys
+
+if sys.argv[1:3] == ["--stack", "gevent"]:
+    from gevent import monkey
+    monkey.patch_all()
+
+import argparse, json, os, resource, subprocess, tempfile, time
+from datetime import timedelta
+from flask_jwt_extended import create_access_token
+
+from App.main import create_app
+from benchmarks.seed import seed_database
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def rss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def summarize(latencies, elapsed, concurrency, rss_before):
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "requests_per_s": len(latencies) / elapsed,
+        "kib_per_in_flight": (rss_kib() - rss_before) / concurrency
+    }
+
+def run_gevent(app, path, headers, concurrency, requests):
+    import gevent.pool
+    client = app.test_client()
+    latencies = []
+
+    def get(i):
+        began = time.perf_counter()
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.status_code
+        latencies.append((time.perf_counter() - began) * 1000)
+
+    rss_before = rss_kib()
+    began = time.perf_counter()
+    pool = gevent.pool.Pool(concurrency)
+    for i in range(requests):
+        pool.spawn(get, i)
+    pool.join()
+    return summarize(latencies, time.perf_counter() - began, concurrency, rss_before)
+
+def run_asyncio(app, path, headers, concurrency, requests):
+    import asyncio
+    from App.asgi import create_asgi_app
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http", "method": "GET", "path": route, "query_string": query.encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()]
+    }
+    latencies = []
+
+    async def main():
+        api = create_asgi_app(app)
+        limit = asyncio.Semaphore(concurrency)
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def get():
+            async with limit:
+                began = time.perf_counter()
+                status = []
+
+                async def send(message):
+                    if message["type"] == "http.response.start":
+                        status.append(message["status"])
+                await api(scope, receive, send)
+                assert status == [200], status
+                latencies.append((time.perf_counter() - began) * 1000)
+
+        began = time.perf_counter()
+        await asyncio.gather(*(get() for _ in range(requests)))
+        elapsed = time.perf_counter() - began
+        await api.engine.dispose()
+        return elapsed
+
+    rss_before = rss_kib()
+    elapsed = asyncio.run(main())
+    return summarize(latencies, elapsed, concurrency, rss_before)
+
+def child(args):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db, "WORKER_CONNECTIONS": args.concurrency})
+    staff_id = int(args.staff_id)
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(staff_id))}"}
+    path = f"/staff/roster?staff_id={staff_id}&from={args.start}&to={args.end}"
+    run = run_gevent if args.stack == "gevent" else run_asyncio
+    print(json.dumps(run(app, path, headers, args.concurrency, args.requests)))
+
+def main():
+    parser = argparse.ArgumentParser(description="gevent/Flask vs async read API")
+    parser.add_argument("--stack", choices=["gevent", "asyncio"], help=argparse.SUPPRESS)
+    parser.add_argument("--staff-id", help=argparse.SUPPRESS)
+    parser.add_argument("--start", help=argparse.SUPPRESS)
+    parser.add_argument("--end", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help="database URL (defaults to a temporary SQLite file)")
+    parser.add_argument("--staff", type=int, default=200)
+    parser.add_argument("--shifts", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    if args.stack:
+        return child(args)
+
+    args.db = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench-asgi.db")
+    create_app({"SQLALCHEMY_DATABASE_URI": args.db})
+    seeded = seed_database(staff=args.staff, shifts=args.shifts)
+    start = seeded["start"]
+    common = ["--db", args.db, "--concurrency", str(args.concurrency), "--requests", str(args.requests),
+              "--staff-id", str(seeded["staff_ids"][0]),
+              "--start", start.isoformat(), "--end", (start + timedelta(days=28)).isoformat()]
+
+    print(f"{'stack':<10}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}{'KiB/in-flight':>15}")
+    for stack in ("gevent", "asyncio"):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.asgi", "--stack", stack] + common,
+                                check=True, capture_output=True, text=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{stack:<10}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['requests_per_s']:>9.1f}{r['kib_per_in_flight']:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Schedule coverage: the vectorized sweep behind get_schedule_coverage vs
+# counting each 15-minute slot in a Python loop over schedule.shifts.
+#
+#   python -m benchmarks.coverage --shifts 20000
+import argparse, os, tempfile, time
+from datetime import timedelta
+
+from App.main import create_app
+from App.models import Schedule
+from App.controllers import get_schedule_coverage
+from benchmarks.seed import seed_database
+
+SLOT = timedelta(minutes=15)
+
+
+def loop_coverage(schedule_id, start, days):
+    shifts = Schedule.query.get(schedule_id).shifts
+    counts = []
+    for i in range(days * 96):
+        slot_start = start + i * SLOT
+        counts.append(sum(1 for s in shifts if s.start_time <= slot_start and s.end_time >= slot_start + SLOT))
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized vs looped schedule coverage")
+    parser.add_argument("--db", help="database URL (defaults to a temporary SQLite file)")
+    parser.add_argument("--shifts", type=int, default=20000)
+    parser.add_argument("--staff", type=int, default=2000)
+    args = parser.parse_args()
+
+    url = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench-coverage.db")
+    create_app({"SQLALCHEMY_DATABASE_URI": url})
+    # one schedule holding every shift, spread over its week
+    seeded = seed_database(staff=args.staff, schedules=1, shifts=args.shifts)
+    schedule_id = seeded["schedule_ids"][0]
+
+    # the first call also imports numpy
+    get_schedule_coverage(seeded["admin_id"], schedule_id)
+    began = time.perf_counter()
+    coverage = get_schedule_coverage(seeded["admin_id"], schedule_id, demand="06:00=40,22:00=10")
+    vectorized = time.perf_counter() - began
+    days = len(coverage["headcount"]) // 96
+
+    began = time.perf_counter()
+    looped = loop_coverage(schedule_id, seeded["start"], days)
+    loop = time.perf_counter() - began
+    assert looped == coverage["headcount"]
+
+    print(f"{args.shifts} shifts over {days} days ({days * 96} slots)")
+    print(f"{'python loop':<14}{loop * 1000:>10.1f} ms")
+    print(f"{'vectorized':<14}{vectorized * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
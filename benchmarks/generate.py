@@ -0,0 +1,53 @@
+# Schedule generation: wall time of generate_schedule (solve plus the single
+# insert transaction) for --staff staff over --days days, and how close the
+# result gets to the demand curve.
+#
+#   python -m benchmarks.generate --staff 1000 --days 28
+import argparse, os, tempfile, time
+from datetime import datetime
+
+from App.main import create_app
+from App.controllers import generate_schedule
+from benchmarks.seed import seed_database
+
+DEMANDS = {
+    # needs whole 8 hour shifts, so a perfect roster exists
+    "aligned": "00:00=80,06:00=220,14:00=220,22:00=80",
+    # steps that don't line up with shift boundaries, some surplus is unavoidable
+    "unaligned": "00:00=90,07:30=230,12:00=250,17:15=180,21:45=90",
+    # more than 1000 staff at 40 hours a week can give
+    "understaffed": "00:00=150,07:30=380,12:00=420,17:15=300,21:45=150",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Automatic schedule generation")
+    parser.add_argument("--db", help="database URL (defaults to a temporary SQLite file)")
+    parser.add_argument("--staff", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--demand", help="a single demand curve instead of the built-in cases")
+    parser.add_argument("--time-budget", type=float, default=5.0)
+    parser.add_argument("--restarts", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    url = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench-generate.db")
+    create_app({"SQLALCHEMY_DATABASE_URI": url})
+    demands = {"custom": args.demand} if args.demand else DEMANDS
+
+    print(f"{args.staff} staff, {args.days} days, {args.time_budget} s budget, "
+          f"{args.restarts} restart(s) on {args.processes} process(es)")
+    print(f"{'demand':<14}{'wall (s)':>9}{'solve (s)':>10}{'shifts':>8}{'demanded h':>12}{'rostered h':>12}{'short h':>9}")
+    for name, demand in demands.items():
+        # fresh staff each time, so earlier schedules don't use up their hours
+        seeded = seed_database(staff=args.staff, schedules=1, shifts=0)
+        began = time.perf_counter()
+        summary = generate_schedule(seeded["admin_id"], f"Generated {name}", datetime(2025, 1, 6), days=args.days,
+                                    demand=demand, time_budget=args.time_budget, restarts=args.restarts,
+                                    processes=args.processes)
+        wall = time.perf_counter() - began
+        print(f"{name:<14}{wall:>9.2f}{summary['solve_ms'] / 1000:>10.2f}{summary['shifts']:>8}"
+              f"{summary['demand_hours']:>12.0f}{summary['rostered_hours']:>12.0f}{summary['shortfall_hours']:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Login latency under concurrent load in a gevent-patched process (like the
+# gunicorn gevent workers), with password hashing on and off the thread pool.
+# A /health probe runs alongside and records how long it waited beyond its
+# 10ms tick, i.e. how long other greenlets were stalled by hashing.
+#
+#   python -m benchmarks.login --concurrency 20 --logins 200
+from gevent import monkey
+monkey.patch_all()
+
+import argparse, os, statistics, tempfile, time
+import gevent
+from gevent.pool import Pool
+
+from App.main import create_app
+from App.database import db
+from App.controllers import create_user
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(app, users, concurrency, logins):
+    client = app.test_client()
+    login_ms, probe_ms = [], []
+
+    # latency is measured from when the login was queued, not when its greenlet first ran
+    def do_login(i, began):
+        response = client.post("/api/login", json={"username": users[i % len(users)], "password": "benchpass"})
+        assert response.status_code == 200
+        login_ms.append((time.perf_counter() - began) * 1000)
+
+    # a 10ms tick plus a /health call; anything beyond 10ms is time the hub was stalled
+    def probe():
+        while True:
+            began = time.perf_counter()
+            gevent.sleep(0.01)
+            client.get("/health")
+            probe_ms.append((time.perf_counter() - began) * 1000 - 10)
+
+    prober = gevent.spawn(probe)
+    began = time.perf_counter()
+    pool = Pool(concurrency)
+    for i in range(logins):
+        pool.spawn(do_login, i, time.perf_counter())
+    pool.join()
+    elapsed = time.perf_counter() - began
+    prober.kill()
+    return {
+        "login_p50_ms": percentile(login_ms, 50),
+        "login_p99_ms": percentile(login_ms, 99),
+        "logins_per_s": logins / elapsed,
+        "health_p99_ms": percentile(probe_ms, 99) if probe_ms else float("nan"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Login latency under concurrent gevent load")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench-login.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": url})
+    db.create_all()
+    users = [f"login{i}" for i in range(args.users)]
+    for username in users:
+        create_user(username, "benchpass", "staff")
+
+    results = {}
+    for offload in (False, True):
+        app.config["PASSWORD_HASH_OFFLOAD"] = offload
+        results["thread pool" if offload else "on the hub"] = run(app, users, args.concurrency, args.logins)
+
+    print(f"{'hashing':<14}{'login p50':>11}{'login p99':>11}{'logins/s':>10}{'health p99':>12}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['login_p50_ms']:>11.1f}{r['login_p99_ms']:>11.1f}"
+              f"{r['logins_per_s']:>10.1f}{r['health_p99_ms']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
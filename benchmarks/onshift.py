@@ -0,0 +1,50 @@
+# "Who is on shift at T" through the hour-bucket index vs a plain interval
+# query on the shift table, at growing table sizes. The bucket lookup should
+# stay flat as the table grows; the interval query scans every shift that
+# started before T.
+#
+#   python -m benchmarks.onshift --sizes 10000,100000,1000000
+import argparse, os, random, statistics, tempfile, time
+from datetime import timedelta
+from sqlalchemy import select
+
+from App.main import create_app
+from App.database import db
+from App.models import Shift
+from App.controllers.onshift import on_shift_select
+from benchmarks.seed import seed_database
+
+
+def time_lookups(run, times):
+    timings = []
+    for at in times:
+        began = time.perf_counter()
+        run(at)
+        timings.append((time.perf_counter() - began) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="On-shift lookups: hour buckets vs interval query")
+    parser.add_argument("--db", help="database URL (defaults to a temporary SQLite file)")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated shift counts")
+    parser.add_argument("--staff", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    url = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench-onshift.db")
+    create_app({"SQLALCHEMY_DATABASE_URI": url})
+    rng = random.Random(1)
+
+    print(f"{'shifts':>10}{'buckets (ms)':>14}{'interval (ms)':>15}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        # one week per 2000 shifts, so about as many people are on shift at any time
+        weeks = max(1, size // 2000)
+        seeded = seed_database(staff=args.staff, schedules=weeks, shifts=size)
+        times = [seeded["start"] + timedelta(minutes=rng.randrange(weeks * 7 * 24 * 60)) for _ in range(args.lookups)]
+        buckets = time_lookups(lambda at: db.session.execute(on_shift_select(["id", "staff_id"], at)).all(), times)
+        interval = time_lookups(lambda at: db.session.execute(
+            select(Shift.id, Shift.staff_id).where(Shift.start_time <= at, Shift.end_time > at)).all(), times)
+        print(f"{size:>10}{buckets:>14.3f}{interval:>15.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from App.database import db
+from App.models import User, Admin, Staff, Schedule, Shift, ShiftBucket
+
+SHIFT_STARTS = [6, 8, 14, 22]  # start hours of the shift patterns used in the seed data
+
+# the shifts and their hour buckets, as schedule_shifts writes them
+def insert_shifts(rows):
+    db.session.execute(insert(Shift.__table__), rows)
+    db.session.execute(insert(ShiftBucket.__table__), [
+        bucket for row in rows for bucket in ShiftBucket.rows(row["id"], row["start_time"], row["end_time"])
+    ])
+
+# Bulk-loads an admin, staff, weekly schedules and shifts with core inserts so
+# large volumes seed in seconds. Returns the ids the benchmarks need.
+def seed_database(staff=200, schedules=4, shifts=5000, start=datetime(2025, 1, 6), batch_size=50000, seed=1):
+    rng = random.Random(seed)
+    db.drop_all()
+    db.create_all()
+
+    # one hash for everyone; hashing per user would dominate seeding time
+    password = generate_password_hash("benchpass")
+    admin_id = 1
+    staff_ids = list(range(2, staff + 2))
+    db.session.execute(insert(User.__table__), [
+        {"id": admin_id, "username": "benchadmin", "password": password, "role": "admin"}
+    ] + [
+        {"id": i, "username": f"bench{i}", "password": password, "role": "staff"} for i in staff_ids
+    ])
+    db.session.execute(insert(Admin.__table__), [{"id": admin_id}])
+    db.session.execute(insert(Staff.__table__), [{"id": i} for i in staff_ids])
+
+    schedule_ids = list(range(1, schedules + 1))
+    db.session.execute(insert(Schedule.__table__), [
+        {"id": i, "name": f"Week {i}", "created_by": admin_id, "created_at": start} for i in schedule_ids
+    ])
+
+    rows = []
+    for shift_id in range(1, shifts + 1):
+        week = rng.randrange(schedules)
+        shift_start = start + timedelta(days=week * 7 + rng.randrange(7), hours=rng.choice(SHIFT_STARTS))
+        rows.append({
+            "id": shift_id,
+            "staff_id": rng.choice(staff_ids),
+            "schedule_id": schedule_ids[week],
+            "start_time": shift_start,
+            "end_time": shift_start + timedelta(hours=8)
+        })
+        if len(rows) >= batch_size:
+            insert_shifts(rows)
+            rows = []
+    if rows:
+        insert_shifts(rows)
+    db.session.commit()
+
+    return {
+        "admin_id": admin_id,
+        "staff_ids": staff_ids,
+        "schedule_ids": schedule_ids,
+        "shifts": shifts,
+        "start": start
+    }
@@ -0,0 +1,152 @@
+# Times the main controllers and their HTTP endpoints against a seeded database
+# and compares the medians with a saved JSON baseline.
+#
+#   python -m benchmarks.suite --shifts 50000 --save     # record a baseline
+#   python -m benchmarks.suite --shifts 50000            # compare against it
+import argparse, json, os, statistics, sys, tempfile, time
+from datetime import timedelta
+from flask import current_app
+from flask_jwt_extended import create_access_token
+
+from App.main import create_app
+from App.controllers import (
+    get_shift_report, get_shift_report_page, get_combined_roster,
+    clock_in, clock_out, schedule_shift, login
+)
+from App.models import Shift
+from benchmarks.seed import seed_database
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def time_case(run, repeat):
+    timings = []
+    for i in range(repeat):
+        began = time.perf_counter()
+        run(i)
+        timings.append((time.perf_counter() - began) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "runs": repeat
+    }
+
+def build_cases(seeded):
+    admin_id = seeded["admin_id"]
+    staff_id = seeded["staff_ids"][0]
+    schedule_id = seeded["schedule_ids"][0]
+    shift_id = Shift.query.filter_by(staff_id=staff_id).first().id
+    # benchmark-created shifts go far past the seeded range so they never collide
+    future = seeded["start"] + timedelta(days=3650)
+    window = (seeded["start"], seeded["start"] + timedelta(days=7))
+
+    client = current_app.test_client()
+    admin_headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin_id))}"}
+    staff_headers = {"Authorization": f"Bearer {create_access_token(identity=str(staff_id))}"}
+
+    def http(method, url, headers, body=None):
+        def run(i):
+            response = client.open(url, method=method, headers=headers, json=body)
+            assert response.status_code == 200, (url, response.status_code)
+        return run
+
+    def new_shift_times(i):
+        start = future + timedelta(days=i)
+        return start, start + timedelta(hours=8)
+
+    return {
+        "controller.get_shift_report": lambda i: get_shift_report(admin_id),
+        "controller.get_shift_report_page": lambda i: get_shift_report_page(admin_id, limit=100),
+        "controller.get_combined_roster": lambda i: get_combined_roster(staff_id),
+        "controller.get_combined_roster_mine_week": lambda i: get_combined_roster(
+            staff_id, for_staff_id=staff_id, start=window[0], end=window[1]),
+        "controller.clock_in": lambda i: clock_in(staff_id, shift_id),
+        "controller.clock_out": lambda i: clock_out(staff_id, shift_id),
+        "controller.schedule_shift": lambda i: schedule_shift(
+            admin_id, staff_id, schedule_id, *new_shift_times(i)),
+        "controller.login": lambda i: login(f"bench{staff_id}", "benchpass"),
+        "http.shift_report": http("GET", "/shiftReport", admin_headers),
+        "http.shift_report_page": http("GET", "/shiftReport?limit=100", admin_headers),
+        "http.staff_roster": http("GET", "/staff/roster", staff_headers),
+        "http.staff_roster_mine_week": http(
+            "GET", f"/staff/roster?staff_id={staff_id}&from={window[0].isoformat()}&to={window[1].isoformat()}",
+            staff_headers),
+        "http.clock_in": http("POST", "/staff/clock_in", staff_headers, {"shiftID": shift_id}),
+        "http.clock_out": http("POST", "/staff/clock_out/", staff_headers, {"shiftID": shift_id}),
+        "http.create_shift": lambda i: http("POST", "/createShift", admin_headers, {
+            "staffID": staff_id, "scheduleID": schedule_id,
+            "start_time": new_shift_times(10000 + i)[0].isoformat(),
+            "end_time": new_shift_times(10000 + i)[1].isoformat()
+        })(i),
+        "http.login": http("POST", "/api/login", {}, {"username": f"bench{staff_id}", "password": "benchpass"}),
+    }
+
+# Seeds the current app's database and times every case. Login cases hash a
+# password per call, so they run at most `slow_repeat` times.
+def run_suite(staff=200, schedules=4, shifts=5000, repeat=20, slow_repeat=5, only=None):
+    seeded = seed_database(staff=staff, schedules=schedules, shifts=shifts)
+    results = {}
+    for name, run in build_cases(seeded).items():
+        if only and only not in name:
+            continue
+        results[name] = time_case(run, min(repeat, slow_repeat) if name.endswith("login") else repeat)
+    return {
+        "params": {"staff": staff, "schedules": schedules, "shifts": shifts},
+        "results": results
+    }
+
+# Cases whose median got slower than the baseline by more than `tolerance` (0.5 = 50%)
+def compare(current, baseline, tolerance):
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before and result["median_ms"] > before["median_ms"] * (1 + tolerance):
+            regressions.append((name, before["median_ms"], result["median_ms"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Controller and endpoint benchmark suite")
+    parser.add_argument("--db", help="database URL (defaults to a temporary SQLite file)")
+    parser.add_argument("--staff", type=int, default=200)
+    parser.add_argument("--schedules", type=int, default=4)
+    parser.add_argument("--shifts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", help="only run cases whose name contains this text")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown before a case is flagged (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    url = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench-suite.db")
+    create_app({"SQLALCHEMY_DATABASE_URI": url})
+    current = run_suite(args.staff, args.schedules, args.shifts, args.repeat, only=args.only)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["params"] != current["params"]:
+            print(f"⚠️ Baseline was recorded with {baseline['params']}; not comparing")
+            baseline = None
+
+    print(f"{'case':<42}{'median ms':>11}{'p95 ms':>10}{'baseline':>10}{'change':>9}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name) if baseline else None
+        change = f"{(result['median_ms'] / before['median_ms'] - 1) * 100:+.0f}%" if before else ""
+        print(f"{name:<42}{result['median_ms']:>11.2f}{result['p95_ms']:>10.2f}"
+              f"{before['median_ms'] if before else '':>10}{change:>9}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+    elif baseline:
+        regressions = compare(current, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"🐢 {name}: {before:.2f}ms -> {after:.2f}ms")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,69 @@
 # gunicorn_config.py
+import glob
 import multiprocessing
+import os
+import sys
+import tempfile
 
 # The socket to bind.
 # "0.0.0.0" to bind to all interfaces. 8000 is the port number.
 bind = "0.0.0.0:8080"
 
 # The number of worker processes for handling requests.
-workers = 4
+# The app reads the same variables to size each worker's connection pool.
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
 
 # Use the 'gevent' worker type for async performance.
 worker_class = 'gevent'
 
+# Greenlets (concurrent requests) per worker.
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", 100))
+
+# The app sizes each worker's connection pool from these, so hand it the
+# values gunicorn actually uses
+os.environ["WEB_CONCURRENCY"] = str(workers)
+os.environ["WORKER_CONNECTIONS"] = str(worker_connections)
+
+# Workers write their request metrics here so /metrics can report all of
+# them (FLASK_METRICS_DIR picks a fixed directory). Counts from a previous run
+# are cleared.
+if "FLASK_METRICS_DIR" not in os.environ:
+    os.environ["FLASK_METRICS_DIR"] = tempfile.mkdtemp(prefix="roster-metrics-")
+metrics_dir = os.environ["FLASK_METRICS_DIR"]
+os.makedirs(metrics_dir, exist_ok=True)
+for path in glob.glob(os.path.join(metrics_dir, "metrics-*.json")):
+    os.remove(path)
+
 # Log level
 loglevel = 'info'
 
 # Where to log to
 accesslog = '-'  # '-' means log to stdout
-errorlog = '-'  # '-' means log to stderr
\ No newline at end of file
+errorlog = '-'  # '-' means log to stderr
+
+# -w/--workers on the command line overrides the value above; without
+# preload_app the app loads in each worker, after this
+def on_starting(server):
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+    os.environ["WORKER_CONNECTIONS"] = str(server.cfg.worker_connections)
+
+# With preload_app the app and its engine are created in the master, so each
+# worker drops the inherited pool, and makes psycopg2 cooperative once gevent
+# has patched the worker.
+def post_fork(server, worker):
+    wsgi = sys.modules.get("wsgi")
+    if wsgi is not None:
+        from App.database import dispose_after_fork
+        dispose_after_fork(wsgi.app)
+
+# Writes the worker's latest metrics, which can be up to METRICS_FLUSH_SECONDS
+# behind, before it goes
+def worker_exit(server, worker):
+    metrics = sys.modules.get("App.metrics")
+    if metrics is not None and metrics.metrics.directory:
+        metrics.metrics.flush()
+
+def post_worker_init(worker):
+    from App.concurrency import gevent_active, make_psycopg2_green
+    if gevent_active():
+        make_psycopg2_green()
@@ -1,4 +1,4 @@
-import click, pytest, sys, os
+import click, sys, os, csv, json
 from flask.cli import with_appcontext, AppGroup
 from datetime import datetime
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
@@ -8,11 +8,21 @@ from App.models import User
 from App.main import create_app 
 from App.controllers import (
     create_user, get_all_users_json, get_all_users, initialize,
-    schedule_shift, get_combined_roster, clock_in, clock_out, get_shift_report, login,loginCLI
+    schedule_shift, get_combined_roster, clock_in, clock_out, get_shift_report, login,loginCLI,
+    get_schedule, get_all_schedules, schedule_shifts, get_schedule_summaries,
+    export_shifts, count_shift_export, get_hours_report, get_on_shift, reindex_shifts,
+    get_schedule_coverage, generate_schedule
 )
+from App.utils import gzip_chunks
+from App.batch import BatchRunner, parse_batch_line
 
-app = create_app()
-migrate = get_migrate(app)
+# `flask <command>` only needs the models, controllers and CLI; serving
+# (gunicorn, flask run) and listing routes need the web profile
+WEB_COMMANDS = {"run", "routes"}
+from_cli = os.environ.get("FLASK_RUN_FROM_CLI") == "true"
+app = create_app(profile="cli" if from_cli and not WEB_COMMANDS & set(sys.argv[1:]) else "web")
+# only the flask db commands need Flask-Migrate (and Alembic); gunicorn never loads it
+migrate = get_migrate(app) if from_cli else None
 
 @app.cli.command("init", help="Creates and initializes the database")
 def init():
@@ -86,10 +96,84 @@ def schedule_shift_command(staff_id, schedule_id, start, end):
 
 
 
-@shift_cli.command("roster", help="Staff views combined roster")
-def roster_command():
+@shift_cli.command("import", help="Admin imports shifts from a .csv or .jsonl file in one transaction")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_shifts_command(path):
+    # both formats use the fields staff_id, schedule_id, start_time, end_time
+    admin = require_admin_login()
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            numbered, errors = list(enumerate(csv.DictReader(f), start=1)), []
+        else:
+            numbered, errors = read_jsonl_rows(f)
+    total = len(numbered) + len(errors)
+    result = schedule_shifts(admin.id, [row for _, row in numbered])
+    # schedule_shifts numbers the rows it was given; report the file's row numbers
+    errors += [{"row": numbered[e["row"] - 1][0], "error": e["error"]} for e in result["errors"]]
+    print(f"✅ Imported {len(result['created'])} of {total} shift(s) by {admin.username}")
+    for error in sorted(errors, key=lambda e: e["row"]):
+        print(f"⚠️ Row {error['row']}: {error['error']}")
+
+# (row number, shift) for each readable non-blank line, and row errors for the rest
+def read_jsonl_rows(f):
+    numbered, errors = [], []
+    for number, line in enumerate((line for line in f if line.strip()), start=1):
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append({"row": number, "error": f"Invalid JSON: {e.msg}"})
+            continue
+        if isinstance(row, dict):
+            numbered.append((number, row))
+        else:
+            errors.append({"row": number, "error": "Expected a JSON object"})
+    return numbered, errors
+
+
+@shift_cli.command("export", help="Admin exports shifts to a .csv or .ndjson file (add .gz to compress)")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None, help="Defaults to the file extension")
+@click.option("--from", "start", default=None, help="Only shifts starting at or after this ISO date/time")
+@click.option("--to", "end", default=None, help="Only shifts starting before this ISO date/time")
+@click.option("--schedule", "schedule_id", type=int, default=None, help="Only shifts in this schedule")
+@click.option("--staff", "staff_id", type=int, default=None, help="Only this staff member's shifts")
+def export_shifts_command(path, fmt, start, end, schedule_id, staff_id):
+    admin = require_admin_login()
+    compress = path.endswith(".gz")
+    name = path[:-3] if compress else path
+    fmt = fmt or ("ndjson" if name.endswith((".ndjson", ".jsonl")) else "csv")
+    filters = dict(
+        start=datetime.fromisoformat(start) if start else None,
+        end=datetime.fromisoformat(end) if end else None,
+        schedule_id=schedule_id,
+        staff_id=staff_id
+    )
+    total = count_shift_export(admin.id, **filters)
+    chunks = export_shifts(admin.id, fmt, **filters)
+    # progress is counted in lines; the csv header is one more
+    with open(path, "wb") as f, click.progressbar(length=total + (fmt == "csv"), label="Exporting") as bar:
+        def tracked():
+            for chunk in chunks:
+                bar.update(chunk.count("\n"))
+                yield chunk
+        output = gzip_chunks(tracked()) if compress else (chunk.encode() for chunk in tracked())
+        for data in output:
+            f.write(data)
+    print(f"✅ Exported {total} shift(s) to {path}")
+
+
+@shift_cli.command("roster", help="Staff views their roster (--all for the combined roster)")
+@click.option("--all", "show_all", is_flag=True, help="Show every staff member's shifts")
+@click.option("--from", "start", default=None, help="Only shifts starting at or after this ISO date/time")
+@click.option("--to", "end", default=None, help="Only shifts starting before this ISO date/time")
+def roster_command(show_all, start, end):
     staff = require_staff_login()
-    roster = get_combined_roster(staff.id)
+    roster = get_combined_roster(
+        staff.id,
+        for_staff_id=None if show_all else staff.id,
+        start=datetime.fromisoformat(start) if start else None,
+        end=datetime.fromisoformat(end) if end else None
+    )
     print(f"📋 Roster for {staff.username}:")
     print(roster)
 
@@ -118,50 +202,81 @@ def report_command():
     print(f"📊 Shift report for {admin.username}:")
     print(report)
 
+@shift_cli.command("hours", help="Admin views worked vs scheduled hours per staff per day or week")
+@click.option("--by", "group", type=click.Choice(["day", "week"]), default="day")
+@click.option("--from", "start", default=None, help="Only shifts starting at or after this ISO date/time")
+@click.option("--to", "end", default=None, help="Only shifts starting before this ISO date/time")
+@click.option("--staff", "staff_id", type=int, default=None, help="Only this staff member")
+@click.option("--grace", type=int, default=0, help="Minutes late/early before a shift counts as a late arrival/early departure")
+def hours_command(group, start, end, staff_id, grace):
+    admin = require_admin_login()
+    rows = get_hours_report(
+        admin.id,
+        group,
+        start=datetime.fromisoformat(start) if start else None,
+        end=datetime.fromisoformat(end) if end else None,
+        staff_id=staff_id,
+        grace=grace
+    )
+    print(f"⏱️ Hours by {group} for {admin.username}:")
+    for r in rows:
+        print(f"{r['period']} {r['staff_name']}: {r['worked_hours']}h worked of {r['scheduled_hours']}h "
+              f"in {r['shifts']} shift(s), {r['late_arrivals']} late, {r['early_departures']} left early")
+
+@shift_cli.command("at", help="Who is on shift at TIME (an ISO date/time, default now)")
+@click.argument("time", default=None, required=False)
+def on_shift_command(time):
+    user = require_cli_login(("admin", "staff"), "🚫 Only admins and staff can use this command.")
+    at = datetime.fromisoformat(time) if time else datetime.now()
+    shifts = get_on_shift(user.id, at)
+    print(f"👥 On shift at {at.isoformat(sep=' ', timespec='minutes')}: {len(shifts)}")
+    for s in shifts:
+        print(f"{s['staff_name']} (shift {s['id']}, {s['start_time']} to {s['end_time']})")
+
+@shift_cli.command("reindex", help="Rebuild the hour-bucket index behind \"shift at\" and /roster/at")
+def reindex_command():
+    admin = require_admin_login()
+    counts = reindex_shifts(admin.id)
+    print(f"✅ Indexed {counts['shifts']} shift(s) into {counts['buckets']} hour bucket(s)")
+
 app.cli.add_command(shift_cli)
 
 
-def require_admin_login():
-    import os
+# The CLI session is the token saved by "flask auth login". It's decoded once
+# per process and reused until the file changes (a new login or logout) or the
+# token expires, so a batch of commands doesn't re-verify it every time.
+TOKEN_FILE = "active_token.txt"
+cli_session = {"stamp": None, "user_id": None, "expires": None}
+
+def require_cli_login(roles, message):
     from flask_jwt_extended import decode_token
     from App.controllers import get_user
 
-    if not os.path.exists("active_token.txt"):
+    try:
+        stat = os.stat(TOKEN_FILE)
+    except FileNotFoundError:
         raise PermissionError("⚠️ No active session. Please login first.")
 
-    with open("active_token.txt", "r") as f:
-        token = f.read().strip()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if cli_session["stamp"] != stamp or (cli_session["expires"] or float("inf")) <= datetime.now().timestamp():
+        with open(TOKEN_FILE, "r") as f:
+            token = f.read().strip()
+        try:
+            decoded = decode_token(token)
+        except Exception as e:
+            raise PermissionError(f"Invalid or expired token. Please login again. ({e})")
+        cli_session.update(stamp=stamp, user_id=decoded["sub"], expires=decoded.get("exp"))
+
+    user = get_user(cli_session["user_id"])
+    if not user or user.role not in roles:
+        raise PermissionError(message)
+    return user
 
-    try:
-        decoded = decode_token(token)
-        user_id = decoded["sub"]
-        user = get_user(user_id)
-        if not user or user.role != "admin":
-            raise PermissionError("🚫 Only an admin can use this command.")
-        return user
-    except Exception as e:
-        raise PermissionError(f"Invalid or expired token. Please login again. ({e})")
+def require_admin_login():
+    return require_cli_login(("admin",), "🚫 Only an admin can use this command.")
 
 def require_staff_login():
-    import os
-    from flask_jwt_extended import decode_token
-    from App.controllers import get_user
-
-    if not os.path.exists("active_token.txt"):
-        raise PermissionError("⚠️ No active session. Please login first.")
-
-    with open("active_token.txt", "r") as f:
-        token = f.read().strip()
-
-    try:
-        decoded = decode_token(token)
-        user_id = decoded["sub"]
-        user = get_user(user_id)
-        if not user or user.role != "staff":
-            raise PermissionError("🚫 Only staff can use this command.")
-        return user
-    except Exception as e:
-        raise PermissionError(f"Invalid or expired token. Please login again. ({e})")
+    return require_cli_login(("staff",), "🚫 Only staff can use this command.")
 
 schedule_cli = AppGroup('schedule', help='Schedule management commands')
 
@@ -177,10 +292,16 @@ def create_schedule_command(name):
 
 
 @schedule_cli.command("list", help="List all schedules")
-def list_schedules_command():
-    from App.models import Schedule
+@click.option("--summary", is_flag=True, help="Only id, name, creator and shift count")
+def list_schedules_command(summary):
     admin = require_admin_login()
-    schedules = Schedule.query.all()
+    if summary:
+        schedules = get_schedule_summaries(admin.id)
+        print(f"✅ Found {len(schedules)} schedule(s):")
+        for s in schedules:
+            print(f"{s['id']}: {s['name']} by {s['creator']} ({s['shift_count']} shifts)")
+        return
+    schedules = get_all_schedules()
     print(f"✅ Found {len(schedules)} schedule(s):")
     for s in schedules:
         print(s.get_json())
@@ -189,16 +310,122 @@ def list_schedules_command():
 @schedule_cli.command("view", help="View a schedule and its shifts")
 @click.argument("schedule_id", type=int)
 def view_schedule_command(schedule_id):
-    from App.models import Schedule
     admin = require_admin_login()
-    schedule = db.session.get(Schedule, schedule_id)
+    schedule = get_schedule(schedule_id)
     if not schedule:
         print("⚠️ Schedule not found.")
     else:
         print(f"✅ Viewing schedule {schedule_id}:")
         print(schedule.get_json())
 
+@schedule_cli.command("coverage", help="Staff rostered per slot of a schedule against the demand curve")
+@click.argument("schedule_id", type=int)
+@click.option("--from", "start", default=None, help="First day (default: the first shift's)")
+@click.option("--to", "end", default=None, help="Day after the last one (default: after the last shift)")
+@click.option("--demand", default=None, help="Minimum staff by time of day, e.g. 08:00=3,17:00=2 (default: COVERAGE_DEMAND)")
+def coverage_command(schedule_id, start, end, demand):
+    admin = require_admin_login()
+    coverage = get_schedule_coverage(
+        admin.id,
+        schedule_id,
+        start=datetime.fromisoformat(start) if start else None,
+        end=datetime.fromisoformat(end) if end else None,
+        demand=demand
+    )
+    print(f"📈 Coverage of schedule {schedule_id} from {coverage['start']} to {coverage['end']} "
+          f"in {coverage['slot_minutes']} minute slots, demand {coverage['demand'] or 'none'}:")
+    print(f"{coverage['shifts']} shift(s), peak {coverage['peak_headcount']} on shift, "
+          f"{coverage['understaffed_slots']} slot(s) understaffed, {coverage['staff_hours_short']} staff hours short")
+    for run in coverage["shortfalls"]:
+        print(f"{run['start']} to {run['end']}: up to {run['max_short']} short, as few as {run['min_rostered']} rostered")
+
+@schedule_cli.command("generate", help="Create a schedule filled from a demand curve")
+@click.argument("name")
+@click.option("--start", default=None, help="First day (default: today)")
+@click.option("--days", type=int, default=28, show_default=True)
+@click.option("--demand", default=None, help="Minimum staff by time of day, e.g. 08:00=3,17:00=2 (default: COVERAGE_DEMAND)")
+@click.option("--staff", default=None, help="Comma-separated staff ids (default: all staff)")
+@click.option("--shift-hours", type=float, default=8, show_default=True)
+@click.option("--max-hours", type=float, default=40, show_default=True, help="Per staff member per week")
+@click.option("--min-rest", type=float, default=11, show_default=True, help="Hours between a staff member's shifts")
+@click.option("--start-every", type=int, default=60, show_default=True, help="Minutes between possible shift starts")
+@click.option("--time-budget", type=float, default=None, help="Solver seconds (default: SCHEDULE_SOLVER_SECONDS)")
+@click.option("--restarts", type=int, default=1, show_default=True, help="Independent solver runs; the best is kept")
+@click.option("--processes", type=int, default=1, show_default=True, help="Worker processes for the restarts")
+def generate_schedule_command(name, start, days, demand, staff, shift_hours, max_hours, min_rest, start_every,
+                              time_budget, restarts, processes):
+    admin = require_admin_login()
+    summary = generate_schedule(
+        admin.id,
+        name,
+        datetime.fromisoformat(start) if start else datetime.utcnow(),
+        days=days,
+        demand=demand,
+        staff_ids=[int(staff_id) for staff_id in staff.split(",")] if staff else None,
+        shift_hours=shift_hours,
+        max_hours=max_hours,
+        min_rest=min_rest,
+        start_every=start_every,
+        time_budget=time_budget,
+        restarts=restarts,
+        processes=processes
+    )
+    print(f"✅ Schedule {summary['schedule_id']} ({summary['name']}) from {summary['start']} to {summary['end']}: "
+          f"{summary['shifts']} shift(s) for {summary['staff_used']} staff in {summary['solve_ms']} ms")
+    print(f"{summary['rostered_hours']} staff hours rostered for {summary['demand_hours']} demanded, "
+          f"{summary['shortfall_hours']} short")
+
 app.cli.add_command(schedule_cli)
+'''
+Batch Commands
+'''
+
+@app.cli.command("shell-batch", help="Run many commands in one process, one per line from PATH or stdin")
+@click.argument("source", type=click.File("r"), default="-")
+def shell_batch_command(source):
+    # lines are commands as typed after "flask", or JSON {"command": ...} / {"args": [...]}
+    runner = BatchRunner(app.cli, app, exclude={"shell-batch"})
+    if source.isatty():
+        return repl(runner)
+    for number, line in enumerate(source, 1):
+        try:
+            args = parse_batch_line(line)
+        except ValueError as e:
+            click.echo(json.dumps({"line": number, "ok": False, "error": f"Unreadable line: {e}"}))
+            continue
+        if args is not None:
+            click.echo(json.dumps(dict(line=number, **runner.run(args))))
+    click.echo(json.dumps({"summary": runner.summary()}))
+
+# Interactive version of shell-batch: plain output and a timing after each command
+def repl(runner):
+    try:
+        import readline  # noqa: F401 (line editing and history for input())
+    except ImportError:
+        pass
+    click.echo("Type commands as you would after 'flask' (e.g. shift roster); 'exit' to quit.")
+    while True:
+        try:
+            line = input("flask> ")
+        except EOFError:
+            break
+        if line.strip() in ("exit", "quit"):
+            break
+        try:
+            args = parse_batch_line(line)
+        except ValueError as e:
+            click.echo(f"⚠️ {e}")
+            continue
+        if args is None:
+            continue
+        result = runner.run(args)
+        click.echo(result["output"], nl=False)
+        if not result["ok"]:
+            click.echo(f"⚠️ {result['error']}")
+        click.echo(f"({result['ms']:.1f} ms)")
+    summary = runner.summary()
+    click.echo(f"{summary['commands']} command(s), {summary['failed']} failed, {summary['total_ms']:.1f} ms")
+
 '''
 Test Commands
 '''
@@ -207,6 +434,7 @@ test = AppGroup('test', help='Testing commands')
 @test.command("user", help="Run User tests")
 @click.argument("type", default="all")
 def user_tests_command(type):
+    import pytest
     if type == "unit":
         sys.exit(pytest.main(["-k", "UserUnitTests"]))
     elif type == "int":